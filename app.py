@@ -1,10 +1,15 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+# plotly.express (~250 ms to import) is imported inside the functions that draw charts
 from datetime import date, datetime, timedelta
 import time
+import json
+import db
+import perf
+import assets
 import utils
+import rollover
 import streamlit.components.v1 as components
 
 
@@ -34,146 +39,81 @@ def safe_rerun():
     st.session_state["_needs_rerun_toggle"] = not st.session_state.get("_needs_rerun_toggle", False)
 
 
-# add this after st.set_page_config(...)
-st.markdown(
-"""
-<style>
-:root{
-  --page-padding: 200px; /* change this value to taste */
-}
 
-/* Target Streamlit's main block container */
-div[data-testid="stApp"] div.block-container {
-  padding-left: var(--page-padding) !important;
-  padding-right: var(--page-padding) !important;
-  max-width: none !important; /* keep full wide-layout width but with padding */
-  box-sizing: border-box !important;
-}
+# ---------- PAGE CONFIG & STYLING ----------
+st.set_page_config(page_title="🎯 Smart Goal Coach", layout="wide")
+# one stylesheet for every page (static/global.css), read and compacted once per process
+st.markdown(assets.style("global.css"), unsafe_allow_html=True)
 
-/* Make it responsive on small screens */
-@media (max-width: 900px) {
-  :root { --page-padding: 16px; }
-  div[data-testid="stApp"] div.block-container {
-    padding-left: var(--page-padding) !important;
-    padding-right: var(--page-padding) !important;
-  }
-}
+# ---------- DATABASE ----------
+@st.cache_resource(show_spinner=False)
+def _db_pools():
+    """Migrate once and open the write/read connection pools shared by every session and rerun."""
+    db.init_db()
+    return db.get_pool(), db.get_read_pool()
 
-/* If you have components rendered via components.html, it's often safer to add padding inside them too:
-   .my-component-wrapper { padding-left: var(--page-padding); padding-right: var(--page-padding); }
-*/
-</style>
-""",
-unsafe_allow_html=True,
-)
+# a reloaded db module adopts the cached pools instead of opening a second set
+db.set_pools(*_db_pools())
 
-# ---------- PAGE CONFIG & STYLING ----------
-st.set_page_config(page_title="🎯 Smart Goal Coach", layout="wide")
-st.markdown("""
-<style>
-:root {
-  --primary: #6C63FF;
-  --bg: #F9FAFB;
-  --card: #FFFFFF;
-  --text: #222222;
-  --muted: #6B7280;
-}
-body { background-color: var(--bg); color: var(--text); }
-.card { background: var(--card); padding:16px; border-radius:12px; box-shadow:0 6px 20px rgba(17,24,39,0.06); margin-bottom:16px; }
-.goal-title { font-weight:700; color:var(--text); font-size:18px; }
-.muted { color:var(--muted); font-size:13px; }
-.progress-pill { background:#EEF2FF; color:var(--primary); padding:6px 10px; border-radius:999px; font-weight:600; }
-.small { font-size:13px; color:var(--muted); }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False)
+def _rollover_worker():
+    """Background week-rollover thread, one per server process (GOALS_ROLLOVER_INTERVAL=0 disables it)."""
+    return rollover.start_worker() if rollover.INTERVAL > 0 else None
+
+_rollover_worker()
+
+# ---------- SESSION COOKIE ----------
+SESSION_COOKIE = "goals_session"
+
+def queue_session_cookie(token):
+    """Set (or, with None, clear) the session cookie on this or the next run (go_to() reruns first)."""
+    st.session_state["_session_cookie"] = token
+
+def write_session_cookie():
+    """
+    Streamlit can't send Set-Cookie, so a zero-height component writes the cookie on the
+    app's own document; the server reads it back from st.context.cookies next session.
+    """
+    if "_session_cookie" not in st.session_state:
+        return
+    token = st.session_state.pop("_session_cookie")
+    max_age = utils.SESSION_TTL_DAYS * 86400 if token else 0
+    components.html(f"""<script>
+const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+window.parent.document.cookie = {json.dumps(SESSION_COOKIE)} + "=" + {json.dumps(token or "")}
+    + "; Path=/; Max-Age={max_age}; SameSite=Strict" + secure;
+</script>""", height=0)
 
 # ---------- SESSION STATE ----------
 if "page" not in st.session_state:
     st.session_state.page = "home"
 if "user" not in st.session_state:
     st.session_state.user = None
+# a returning browser brings its session token in a cookie; a live token logs the user
+# straight back in without a bcrypt verify and is swapped for a new one. A token that fails
+# leaves the cookie alone: another tab may have just replaced it with a good one.
+if st.session_state.user is None and not st.session_state.get("_session_cookie_checked"):
+    st.session_state["_session_cookie_checked"] = True
+    st.session_state.user, _new_token = utils.rotate_session(st.context.cookies.get(SESSION_COOKIE))
+    if st.session_state.user is not None:
+        st.session_state.session_token = _new_token
+        queue_session_cookie(_new_token)
+        if st.session_state.page == "home":
+            st.session_state.page = "dashboard"
+write_session_cookie()
 if "current_monday" not in st.session_state:
     st.session_state.current_monday = utils.iso(utils.monday_of_week(date.today()))
 if "carry_prompt_shown_for_week" not in st.session_state:
     st.session_state.carry_prompt_shown_for_week = None  # to avoid repeated prompts
 
-st.markdown("""
-<style>
-:root{
-  --primary: #6C63FF;
-  --bg: #F9FAFB;
-  --card: #FFFFFF;
-  --text: #222222;
-  --muted: #6B7280;
-}
-
-/* base */
-body{ background-color:var(--bg); color:var(--text); }
-.card{ background:var(--card); padding:16px; border-radius:12px; box-shadow:0 6px 20px rgba(17,24,39,0.06); margin-bottom:16px; }
-.goal-title{ font-weight:700; color:var(--text); font-size:18px; }
-.muted{ color:var(--muted); font-size:13px; }
-.progress-pill{ background:#EEF2FF; color:var(--primary); padding:6px 10px; border-radius:999px; font-weight:600; }
-.small{ font-size:13px; color:var(--muted); }
-
-/* Global Streamlit button styling */
-.stButton>button,
-div.stButton>button{
-  background: var(--primary) !important;
-  color: #fff !important;
-  border: 0 !important;
-  border-radius: 8px !important;
-  padding: 8px 12px !important;
-  font-weight:600 !important;
-  box-shadow:none !important;
-  min-height:40px !important;
-  white-space:nowrap !important;
-}
-
-/* Sidebar buttons full width */
-[data-testid="stSidebar"] .stButton>button{
-  width:100% !important;
-  display:block !important;
-  text-align:left !important;
-  padding-left:14px !important;
-}
-
-
-/* Action column wrapper */
-.action-col{
-  display:flex;
-  flex-direction:column;
-  align-items:flex-end; /* right-align the buttons/alert */
-  gap:8px;
-}
-
-/* confirm row: buttons side-by-side, same width */
-.confirm-row{ display:flex; gap:8px; align-items:center; justify-content:flex-end; flex-wrap:nowrap; }
-.confirm-row .stButton>button{ width:150px !important; }
-
-/* action buttons uniform width inside action-col */
-.action-col .stButton>button{ width:150px !important; }
-
-/* confirm alert box */
-.confirm-alert{
-  background:#fff7d6;
-  border-left:4px solid #f59e0b;
-  padding:10px 12px;
-  border-radius:8px;
-  max-width:260px;
-  text-align:left;
-  font-size:13px;
-}
-  
-
-/* responsive fallback */
-@media (max-width:520px){
-  .confirm-row{ flex-wrap:wrap; }
-  .confirm-row .stButton>button{ width:100% !important; }
-  .action-col .stButton>button{ width:100% !important; }
-}
-</style>
-""", unsafe_allow_html=True)
-
+# ---------- SQL INSTRUMENTATION ----------
+# record every statement of this run when the sidebar "Performance" panel asks for it
+# (or GOALS_DB_QUERY_LOG is set); the router below stops recording when the run ends
+if st.session_state.get("perf_record_sql") or db.QUERY_LOG_PATH:
+    db.start_query_stats(label=st.session_state.page)
+# likewise for perf spans (section and utils call timings)
+if st.session_state.get("perf_record_spans"):
+    perf.start(label=st.session_state.page)
 
 
 def go_to(page):
@@ -201,6 +141,8 @@ def render_sidebar_for(key_prefix="sb"):
 
         st.sidebar.markdown("---")
         if st.sidebar.button("🚪 Logout", key=f"{key_prefix}_logout"):
+            utils.end_session(st.session_state.pop("session_token", None))
+            queue_session_cookie(None)
             st.session_state.user = None
             st.session_state.carry_prompt_shown_for_week = None
             go_to("home")
@@ -211,6 +153,55 @@ def render_sidebar_for(key_prefix="sb"):
         if st.sidebar.button("📝 Create account", key=f"{key_prefix}_signup"):
             go_to("signup")
 
+    render_perf_panel(key_prefix)
+
+def render_perf_panel(key_prefix="sb"):
+    """
+    Sidebar debug panel: SQL statements, latency and rows of the previous rerun
+    (recorded by db.start_query_stats / stop_query_stats around the router).
+    """
+    with st.sidebar.expander("⚙️ Performance", expanded=False):
+        st.checkbox("Record SQL per rerun", key="perf_record_sql")
+        stats = st.session_state.get("_last_query_stats")
+        if not st.session_state.get("perf_record_sql"):
+            st.caption("Off — turn on to record the statements each rerun issues.")
+        elif not stats:
+            st.caption("Recording starts with the next rerun.")
+        else:
+            st.markdown(
+                f"**Last rerun** ({stats['label']}): {stats['count']} statements · "
+                f"{stats['total_ms']:.1f} ms · {stats['rows']} rows"
+            )
+            if stats["statements"]:
+                st.dataframe(pd.DataFrame(stats["statements"]), hide_index=True)
+            st.download_button(
+                "Download JSON",
+                data=json.dumps(stats, indent=2),
+                file_name="query_stats.json",
+                mime="application/json",
+                key=f"{key_prefix}_perf_download",
+            )
+        st.checkbox("Record timing spans per rerun", key="perf_record_spans")
+        spans = st.session_state.get("_last_spans")
+        if st.session_state.get("perf_record_spans") and spans:
+            st.markdown(f"**Spans** ({spans['label']}): {spans['count']} · {spans['total_ms']:.1f} ms run")
+            if spans["spans"]:
+                table = pd.DataFrame(spans["spans"])
+                table["args"] = table["args"].map(lambda a: ", ".join(f"{k}={v}" for k, v in a.items()))
+                st.dataframe(table, hide_index=True)
+            st.download_button(
+                "Download Chrome trace",
+                data=st.session_state.get("_last_spans_trace", "{}"),
+                file_name="spans_trace.json",
+                mime="application/json",
+                key=f"{key_prefix}_perf_trace_download",
+            )
+        wc = utils.week_cache_stats()
+        st.caption(
+            f"Week cache: {wc['hits']} hits · {wc['misses']} misses · {wc['entries']} entries "
+            f"({wc['bytes'] / 1024:.0f} KiB) · {wc['evictions']} evictions · {wc['invalidations']} invalidations"
+        )
+
 # ---------- AUTH UI ----------
 def login_ui():
     st.markdown("""
@@ -237,6 +228,8 @@ def login_ui():
         user = utils.login_user(email.strip(), password)
         if user:
             st.session_state.user = user
+            st.session_state.session_token = utils.create_session(user["id"])
+            queue_session_cookie(st.session_state.session_token)
             # clear carry prompt state when user logs in
             st.session_state.carry_prompt_shown_for_week = None
             go_to("dashboard")
@@ -298,8 +291,8 @@ def prompt_carry_over_if_needed(user_id, new_week_iso):
     prev_monday = datetime.strptime(new_week_iso, "%Y-%m-%d").date() - timedelta(days=7)
     prev_week_iso = utils.iso(prev_monday)
 
-    # Identify missed/uncompleted tasks from prev week due before new_week_iso
-    missed_df = utils.detect_missed_tasks_from_week(user_id, prev_week_iso, new_week_iso)
+    # Missed/uncompleted tasks from prev week due before new_week_iso, precomputed by the rollover job
+    missed_df = utils.get_carry_candidates(user_id, new_week_iso)
     if missed_df.empty:
         st.session_state.carry_prompt_shown_for_week = new_week_iso
         return None
@@ -381,81 +374,14 @@ def home_ui():
     """
     Home / marketing page for SMART Goal Coach rendered in Streamlit.
     Replaces raw HTML printing and wires CTA buttons to go_to().
+    The static CSS/HTML lives in static/ and is loaded once per process (assets.py).
     """
 
-    # Remove Streamlit’s default container padding
-    st.markdown("""
-        <style>
-        div[data-testid="stApp"] div.block-container {
-            padding-left: 0 !important;
-            padding-right: 0 !important;
-            padding-top: 0 !important;
-            max-width: none !important;
-            box-sizing: border-box !important;
-        }
-
-        @media (max-width: 900px) {
-            div[data-testid="stApp"] div.block-container {
-                padding-left: 12px !important;
-                padding-right: 12px !important;
-            }
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # full-width layout (no container padding) + hero/testimonial styles
+    st.markdown(assets.style("home.css"), unsafe_allow_html=True)
 
     render_sidebar_for(key_prefix="sb_home")
 
-    # ✅ FIXED CSS BLOCK — properly closed
-    css = """
-    <style>
-    :root{
-      --primary: #6C63FF;
-      --bg: #F9FAFB;
-      --card: #FFFFFF;
-      --text: #0f172a;
-      --muted: #6B7280;
-      --accent: linear-gradient(90deg,#6C63FF,#9D97FF);
-      --border: #E6E9F0;
-    }
-
-    .hero {
-      padding:56px 20px;
-      text-align:center;
-      background: linear-gradient(180deg, rgba(108,99,255,0.06), rgba(249,250,251,0));
-    }
-    .hero h1 {
-      font-size:clamp(28px, 5vw, 56px);
-      margin:0 0 12px;
-      line-height:1.02;
-      font-weight:800;
-    }
-    .hero p {
-      color:var(--muted);
-      font-size:clamp(14px, 1.6vw, 20px);
-      max-width:900px;
-      margin:0 auto 22px;
-    }
-
-    .cta-row { display:flex; gap:12px; justify-content:center; margin-top:18px; flex-wrap:wrap; }
-    .btn-primary { background:var(--primary); color:white; padding:14px 28px; border-radius:999px; text-decoration:none; font-weight:700; box-shadow:0 8px 30px rgba(108,99,255,0.12); }
-    .btn-outline { border:2px solid var(--primary); color:var(--primary); padding:12px 26px; border-radius:999px; text-decoration:none; font-weight:700; background:transparent; }
-
-
-    /* --- Testimonials --- */
-    .testimonials { padding:48px 20px; background:linear-gradient(180deg, rgba(108,99,255,0.03), transparent); }
-    .test-grid { display:grid; gap:20px; grid-template-columns:repeat(auto-fit,minmax(260px,1fr)); max-width:1100px; margin:0 auto; }
-    .testimonial { background:var(--card); border-radius:12px; padding:20px; border:1px solid var(--border); }
-    .avatar { width:48px; height:48px; border-radius:999px; display:flex; align-items:center; justify-content:center; color:white; font-weight:700; }
-
-
-    </style>
-    """  # ✅ this was missing before!
-
-    st.markdown(css, unsafe_allow_html=True)
-
-
-    st.markdown(css, unsafe_allow_html=True)
-
     # Hero
     st.markdown(
         """
@@ -485,215 +411,14 @@ def home_ui():
 
     st.markdown("<br/>", unsafe_allow_html=True)
 
-    
-    # --- ADD this block instead ---
-    import streamlit.components.v1 as components
-    components.html("""
-    <style>
-    :root{
-    --primary: #6C63FF;
-    --bg: #F9FAFB;
-    --card: #FFFFFF;
-    --text: #0f172a;
-    --muted: #6B7280;
-    --accent: linear-gradient(90deg,#6C63FF,#9D97FF);
-    --border: #E6E9F0;
-    }
-
-    .features {
-    padding: 72px 0;
-    background: transparent;
-    }
-
-    .features .inner {
-    max-width: 1200px;
-    margin: 0 auto;
-    padding: 0 60px;
-    box-sizing: border-box;
-    }
-
-    .features-grid {
-    display: grid;
-    grid-template-columns: repeat(3, 1fr);
-    gap: 32px;
-    }
-
-    @media (max-width: 1100px) {
-    .features-grid { grid-template-columns: repeat(2, 1fr); gap: 24px; }
-    }
-
-    @media (max-width: 700px) {
-    .features-grid { grid-template-columns: 1fr; gap: 16px; }
-    }
-
-    .feature-card {
-    background: var(--card, #fff);
-    border: 1px solid var(--border, #e6e9f0);
-    padding: 28px;
-    border-radius: 14px;
-    box-shadow: 0 6px 22px rgba(2, 6, 23, 0.05);
-    display: flex;
-    flex-direction: column;
-    justify-content: flex-start;
-    transition: transform 0.2s ease, box-shadow 0.2s ease;
-    }
-
-    .feature-card:hover {
-    transform: translateY(-4px);
-    box-shadow: 0 10px 28px rgba(2, 6, 23, 0.08);
-    }
-
-    .feature-icon {
-    width: 56px;
-    height: 56px;
-    border-radius: 999px;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    background: rgba(108,99,255,0.08);
-    margin-bottom: 14px;
-    font-size: 22px;
-    }
-
-    .feature-card h3 {
-    margin: 0 0 8px 0;
-    font-size: 20px;
-    font-weight: 700;
-    }
-
-    .feature-card p {
-    color: var(--muted, #6B7280);
-    margin: 0;
-    line-height: 1.5;
-    }
-
-    .muted { color: var(--muted); }
-    </style>
-
-    <section class="features">
-    <div class="inner">
-        <div style="text-align:center; margin:0 auto 28px; max-width:900px;">
-        <h2 style="margin:0 0 10px; font-size:32px;">The SMART Way to Success</h2>
-        <p class="muted">Our proven methodology breaks down your goals into manageable, achievable steps</p>
-        </div>
-
-        <div class="features-grid">
-        <div class="feature-card">
-            <div class="feature-icon">🎯</div>
-            <h3>Specific</h3>
-            <p>Define clear and precise goals that give you direction and focus on what matters most.</p>
-        </div>
-
-        <div class="feature-card">
-            <div class="feature-icon">📈</div>
-            <h3>Measurable</h3>
-            <p>Track your progress with quantifiable metrics and celebrate milestones along the way.</p>
-        </div>
-
-        <div class="feature-card">
-            <div class="feature-icon">✔️</div>
-            <h3>Achievable</h3>
-            <p>Set realistic goals that challenge you while remaining within your capabilities.</p>
-        </div>
-
-        <div class="feature-card">
-            <div class="feature-icon">🏆</div>
-            <h3>Relevant</h3>
-            <p>Align your goals with your values and long-term objectives for meaningful progress.</p>
-        </div>
-
-        <div class="feature-card">
-            <div class="feature-icon">📅</div>
-            <h3>Time-bound</h3>
-            <p>Set deadlines and timelines to create urgency and maintain momentum toward success.</p>
-        </div>
-
-        <div class="feature-card">
-            <div class="feature-icon">👥</div>
-            <h3>Focus Mode</h3>
-            <p>A simple, distraction-free timer to get you into work quickly. Minutes matter more than motivation — use short, focused sessions to build rhythm and finish tasks without drama.</p>
-        </div>
-        </div>
-    </div>
-    </section>
-    """, height=850, scrolling=False)
-
-
-    # --- END ADD ---
-
+    # SMART feature cards (own iframe, so they carry their own styles)
+    components.html(assets.text("home_features.html"), height=850, scrolling=False)
 
     # Testimonials
-    st.markdown('<section class="testimonials" style="padding-top:28px;"><div style="text-align:center; max-width:900px; margin:0 auto 24px;"><h2 style="margin:0 0 10px; font-size:28px;">Success Stories</h2><p class="muted">See how our SMART Goal Coach has transformed lives</p></div>', unsafe_allow_html=True)
-
-    test_html = """
-    <div class="test-grid">
-      <div class="testimonial">
-        <div style="display:flex; gap:12px; align-items:center; margin-bottom:8px;">
-          <div class="avatar" style="background:linear-gradient(90deg,#6C63FF,#9D97FF);">SJ</div>
-          <div>
-            <div style="font-weight:700;">Sarah Johnson</div>
-            <div class="muted" style="font-size:13px;">Entrepreneur</div>
-          </div>
-        </div>
-        <p class="muted">"This platform helped me launch my business in 6 months. The SMART framework kept me focused and accountable every step of the way."</p>
-        <div style="margin-top:10px; color:var(--primary)">★★★★★</div>
-      </div>
-
-      <div class="testimonial">
-        <div style="display:flex; gap:12px; align-items:center; margin-bottom:8px;">
-          <div class="avatar" style="background:linear-gradient(90deg,#6C63FF,#9D97FF);">MC</div>
-          <div>
-            <div style="font-weight:700;">Michael Chen</div>
-            <div class="muted" style="font-size:13px;">Fitness Coach</div>
-          </div>
-        </div>
-        <p class="muted">"I've tried many goal-setting apps, but this one stands out. The AI coaching adapts to my needs and keeps me motivated."</p>
-        <div style="margin-top:10px; color:var(--primary)">★★★★★</div>
-      </div>
-
-      <div class="testimonial">
-        <div style="display:flex; gap:12px; align-items:center; margin-bottom:8px;">
-          <div class="avatar" style="background:linear-gradient(90deg,#6C63FF,#9D97FF);">EP</div>
-          <div>
-            <div style="font-weight:700;">Emily Parker</div>
-            <div class="muted" style="font-size:13px;">Software Developer</div>
-          </div>
-        </div>
-        <p class="muted">"Finally achieved my career goals! The time-bound approach and progress tracking made all the difference."</p>
-        <div style="margin-top:10px; color:var(--primary)">★★★★★</div>
-      </div>
-    </div>
-    </section>
-    """
-    st.markdown(test_html, unsafe_allow_html=True)
-
+    st.markdown(assets.text("home_testimonials.html"), unsafe_allow_html=True)
 
     # ---------- FIXED FOOTER ----------
-    footer_html = """
-    <style>
-    footer {
-    position: fixed;
-    bottom: 0;
-    left: 0;
-    width: 100%;
-    background-color: #f9f9f9;
-    color: #555;
-    text-align: center;
-    padding: 10px 0;
-    font-family: 'Inter', sans-serif;
-    font-size: 15px;
-    border-top: 1px solid #e6e6e6;
-    z-index: 9999;
-    }
-    </style>
-
-    <footer>
-    Built with ❤️ in Streamlit
-    </footer>
-    """
-
-    # Render footer
-    components.html(footer_html, height=60, scrolling=False)
+    components.html(assets.text("footer.html"), height=60, scrolling=False)
 
 
 
@@ -701,6 +426,8 @@ def home_ui():
 
 # ---------- DASHBOARD ----------
 def dashboard_ui():
+    # sections are timed as perf spans (sidebar "Performance" panel); no-ops unless recording
+    controls = perf.span("dashboard.controls")
     # top controls: prev/next week and Start New Week (carry prompt)
     left, mid, right = st.columns([1,2,1])
     with left:
@@ -794,13 +521,18 @@ def dashboard_ui():
     #             st.session_state.clear_quick_goal = True
     #             st.rerun()
 
-    # BEFORE RENDERING GOALS: prompt carry-over if needed (only once per selected week)
-    prompt_carry_over_if_needed(st.session_state.user["id"], st.session_state.current_monday)
+    controls.end()
 
-    # load goals for the week
-    cat_arg = None if cat_filter == "All" else cat_filter.lower()
-    goals = utils.get_goals_for_week(st.session_state.user["id"], st.session_state.current_monday, category=cat_arg)
-    summary = utils.weekly_summary(st.session_state.user["id"], st.session_state.current_monday, category=cat_arg)
+    # BEFORE RENDERING GOALS: prompt carry-over if needed (only once per selected week)
+    with perf.span("dashboard.carry_prompt"):
+        prompt_carry_over_if_needed(st.session_state.user["id"], st.session_state.current_monday)
+
+    # load the whole week (goals + tasks, all categories) in one query; cards show the filtered goals
+    with perf.span("dashboard.load"):
+        cat_arg = None if cat_filter == "All" else cat_filter.lower()
+        week = utils.load_week(st.session_state.user["id"], st.session_state.current_monday)
+        goals = utils.week_goals(week, cat_arg)
+        summary = utils.weekly_summary(st.session_state.user["id"], st.session_state.current_monday, category=cat_arg)
     # -------------------------
     # PRE-CLEAR: ensure any "just added" task form keys are removed BEFORE building widgets
     # (this is essential so text inputs are built empty)
@@ -821,27 +553,31 @@ def dashboard_ui():
                 st.session_state[expander_key] = False
 
     # Top metrics
-    c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Goals", summary["goals"])
-    c2.metric("Tasks", summary["tasks"])
-    c3.metric("Carried", summary["carried"])
-    c4.metric("Completion", f"{summary['completion']}%")
+    with perf.span("dashboard.metrics"):
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Goals", summary["goals"])
+        c2.metric("Tasks", summary["tasks"])
+        c3.metric("Carried", summary["carried"])
+        c4.metric("Completion", f"{summary['completion']}%")
 
     st.markdown("---")
+    # the card loop is long, so its spans are ended explicitly rather than indented under `with`
+    cards = perf.span("dashboard.goal_cards", goals=len(goals))
     if goals.empty:
         st.info("No goals for this week. Use the sidebar to add one.")
     else:
         # iterate goals and render cards
         for g in goals.itertuples():
             goal_id = g.id
-            tasks = utils.get_tasks_for_goal(goal_id)
-            progress = utils.goal_progress(tasks)
+            card = perf.span("dashboard.goal_card", goal_id=goal_id)
+            tasks = week["tasks"][goal_id]
+            progress = week["progress"][goal_id]
 
             st.markdown("<div class='card'>", unsafe_allow_html=True)
 
             # layout: tiny checkbox column, main content, actions column
             cb_col, main_col, action_col = st.columns([0.04, 3.0, 1.0])
-            def _make_goal_toggle_cb(gid):
+            def _make_goal_toggle_cb(gid, task_ids):
                 def _cb():
                     state_key = f"goal_cb_{gid}"
                     checked_val = st.session_state.get(state_key, False)
@@ -849,23 +585,22 @@ def dashboard_ui():
                     # Update all tasks in DB
                     utils.mark_goal_completed(gid, completed=checked_val)
 
-                    # Fetch child tasks to update UI state
-                    tasks_df = utils.get_tasks_for_goal(gid)
-                    for tid in tasks_df["id"].tolist():
+                    # Child task ids come from the week already loaded for this render
+                    for tid in task_ids:
                         st.session_state[f"task_cb_{tid}"] = checked_val
 
+                    # no st.rerun(): Streamlit already reruns the script after an on_change callback
                     st.session_state["_last_change"] = f"goal:{gid}"
-                    st.rerun()
                 return _cb
             # --- left: goal-level checkbox ---
             with cb_col:
-                is_goal_complete = (progress == 100)
+                is_goal_complete = utils.counter_complete(g.task_completed, g.task_active)
                 st.checkbox(
                     " ",
                     value=is_goal_complete,
                     key=f"goal_cb_{goal_id}",
                     label_visibility="collapsed",
-                    on_change=_make_goal_toggle_cb(goal_id)
+                    on_change=_make_goal_toggle_cb(goal_id, tasks["id"].tolist())
                 )
 
                 # def _make_goal_toggle_cb(gid):
@@ -933,19 +668,18 @@ def dashboard_ui():
                 else:
                     for t in tasks.itertuples():
                         cols = st.columns([0.04, 0.72, 0.18, 0.06])
-                        def _make_task_toggle_cb(task_id, title, notes, due_date, goal_id):
+                        def _make_task_toggle_cb(task_id, goal_id):
                             def _cb():
                                 state_key = f"task_cb_{task_id}"
                                 checked_val = st.session_state.get(state_key, False)
-                                utils.update_task(task_id, title, notes or "", due_date or st.session_state.current_monday, checked_val)
+                                goal = utils.set_task_completed(task_id, checked_val)
 
-                                # Check if all tasks under this goal are now complete
-                                tasks_df = utils.get_tasks_for_goal(goal_id)
-                                all_checked = bool(tasks_df["completed"].sum() == len(tasks_df))
-                                st.session_state[f"goal_cb_{goal_id}"] = all_checked
+                                # Tick the goal checkbox from the counters returned with the write
+                                if goal is not None:
+                                    st.session_state[f"goal_cb_{goal_id}"] = utils.counter_complete(
+                                        goal["task_completed"], goal["task_active"])
 
                                 st.session_state["_last_change"] = f"task:{task_id}"
-                                st.rerun()
                             return _cb
 
 
@@ -958,13 +692,7 @@ def dashboard_ui():
                                 value=bool(t.completed),
                                 key=f"task_cb_{t.id}",
                                 label_visibility="collapsed",
-                                on_change=_make_task_toggle_cb(
-                                    t.id,
-                                    t.title,
-                                    t.notes,
-                                    t.due_date,
-                                    goal_id
-                                ),
+                                on_change=_make_task_toggle_cb(t.id, goal_id),
                             )
 
                         # --- Task info ---
@@ -1154,28 +882,31 @@ def dashboard_ui():
 
             st.markdown("</div>", unsafe_allow_html=True)
             st.markdown("<br/>", unsafe_allow_html=True)
-
-    utils.render_smart_insight_engine(
-    st.session_state.user["id"],
-    st.session_state.current_monday,
-    summary
-)
+            card.end()
+    cards.end()
+
+    with perf.span("dashboard.insights"):
+        utils.render_smart_insight_engine(
+            st.session_state.user["id"],
+            st.session_state.current_monday,
+            summary
+        )
 
     
     # weekly charts + insights
-    st.markdown("---")
-    st.subheader("Weekly Progress")
-    goals_list = utils.get_goals_for_week(st.session_state.user["id"], st.session_state.current_monday)
-    rows = []
-    for gg in goals_list.itertuples():
-        tt = utils.get_tasks_for_goal(gg.id)
-        rows.append({"goal": gg.title, "progress": utils.goal_progress(tt)})
-    if rows:
-        df = pd.DataFrame(rows)
-        fig = px.bar(df, x="goal", y="progress", title="Progress by Goal", range_y=[0,100])
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No goal progress to show for this week.")
+    with perf.span("dashboard.progress_chart"):
+        st.markdown("---")
+        st.subheader("Weekly Progress")
+        rows = []
+        for gg in week["goals"].itertuples():
+            rows.append({"goal": gg.title, "progress": week["progress"][gg.id]})
+        if rows:
+            import plotly.express as px
+            df = pd.DataFrame(rows)
+            fig = px.bar(df, x="goal", y="progress", title="Progress by Goal", range_y=[0,100])
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No goal progress to show for this week.")
 
 
 
@@ -1231,15 +962,21 @@ def graphs_ui():
     cat_filter = st.selectbox("Filter category", options=CATEGORY_OPTIONS, index=0, key="graphs_filter_category")
     cat_arg = None if cat_filter == "All" else cat_filter.lower()
 
+    view = st.radio("View", ["This week", "History"], horizontal=True, key="graphs_view")
+    if view == "History":
+        render_history_view(st.session_state.user["id"], cat_arg)
+        return
+
     # ---------- Progress Visualization ----------
-    goals = utils.get_goals_for_week(st.session_state.user["id"], st.session_state.current_monday, category=cat_arg)
+    week = utils.load_week(st.session_state.user["id"], st.session_state.current_monday, category=cat_arg)
+    goals = week["goals"]
 
     rows = []
     for g in goals.itertuples():
-        tasks = utils.get_tasks_for_goal(g.id)
-        rows.append({"Goal": g.title, "Progress": utils.goal_progress(tasks)})
+        rows.append({"Goal": g.title, "Progress": week["progress"][g.id]})
 
     if rows:
+        import plotly.express as px
         df = pd.DataFrame(rows)
         st.subheader("Progress by Goal")
         fig = px.bar(df, x="Goal", y="Progress", range_y=[0,100],
@@ -1274,6 +1011,50 @@ def graphs_ui():
     summary
 )
 
+def render_history_view(user_id, cat_arg):
+    """
+    Multi-week trends: one weekly_rollups range read (utils.load_history), aggregated per
+    week and per category in pandas.
+    """
+    end_default = datetime.strptime(st.session_state.current_monday, "%Y-%m-%d").date()
+    picked = st.date_input("Date range", value=(end_default - timedelta(weeks=11), end_default),
+                           key="graphs_history_range")
+    if not isinstance(picked, (tuple, list)) or len(picked) != 2:
+        st.info("Pick a start and an end date.")
+        return
+
+    history = utils.load_history(user_id, picked[0], picked[1])
+    weekly = utils.history_by_week(history, cat_arg)
+    if not weekly["goals"].any():
+        st.info("No goals in this date range.")
+        return
+
+    totals = weekly[["goals", "tasks", "completed", "carried", "missed"]].sum()
+    completion = round(totals["completed"] / totals["tasks"] * 100) if totals["tasks"] else 0
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Goals", int(totals["goals"]))
+    c2.metric("Tasks", int(totals["tasks"]))
+    c3.metric("Carried / Missed", f"{int(totals['carried'])} / {int(totals['missed'])}")
+    c4.metric("Completion", f"{completion}%")
+
+    import plotly.express as px
+    st.subheader("Completion Trend")
+    fig = px.line(weekly, x="week_start", y="completion", markers=True, range_y=[0, 100],
+                  labels={"week_start": "Week", "completion": "Completion (%)"})
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Carried & Missed per Week")
+    fig = px.bar(weekly, x="week_start", y=["carried", "missed"], barmode="group",
+                 labels={"week_start": "Week", "value": "Tasks", "variable": ""})
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("By Category")
+    by_cat = utils.history_by_category(history)
+    fig = px.bar(by_cat, x="category", y=["completed", "carried", "missed"], barmode="group",
+                 labels={"category": "Category", "value": "Tasks", "variable": ""})
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(by_cat.rename(columns=str.title), hide_index=True)
+
 # ----------------------------------------------------------
 
 def focus_ui():
@@ -1309,265 +1090,41 @@ def focus_ui():
     mode_js = "countdown" if mode == "Countdown" else "stopwatch"
     cap_seconds = int(minutes * 60) if (mode == "Stopwatch" and minutes > 0) else 0
 
-    html = f"""
-    <div style="font-family: system-ui, -apple-system, 'Segoe UI', Roboto, 'Helvetica Neue', Arial; text-align:center; padding:8px;">
-      <div id="display" style="font-size:72px; font-weight:700; margin:8px 0;">00:00</div>
-
-      <div style="display:flex; gap:8px; justify-content:center; margin-bottom:12px; flex-wrap:wrap;">
-        <button id="startBtn" style="padding:10px 14px; font-size:16px;">▶️ Start</button>
-        <button id="pauseBtn" style="padding:10px 14px; font-size:16px; display:none;">⏸ Pause</button>
-        <button id="resumeBtn" style="padding:10px 14px; font-size:16px; display:none;">▶️ Resume</button>
-        <button id="resetBtn" style="padding:10px 14px; font-size:16px;">🔁 Reset</button>
-        <button id="lapBtn" style="padding:10px 14px; font-size:16px; display:none;">📌 Lap</button>
-      </div>
-
-      <div style="width:90%; max-width:720px; margin:0 auto;">
-        <div style="height:12px; background:#e6e6e6; border-radius:999px; overflow:hidden;">
-          <div id="progress" style="height:12px; width:0%; background:linear-gradient(90deg,#6C63FF,#4F46E5);"></div>
-        </div>
-      </div>
-
-      <div id="sub" style="color:#6B7280; font-size:13px; margin-top:8px;"></div>
-
-      <div id="laps" style="margin-top:12px; max-height:120px; overflow:auto; text-align:left; display:none;">
-        <b>Laps:</b>
-        <ol id="lapList"></ol>
-      </div>
-    </div>
-
-    <script>
-    (function(){{
-      // injected values
-      const initialSeconds = {initial_seconds};   // for countdown only
-      const mode = "{mode_js}";                  // "countdown" or "stopwatch"
-      const capSeconds = {cap_seconds};          // optional cap for stopwatch (0 = no cap)
-
-      // DOM refs
-      const display = document.getElementById("display");
-      const startBtn = document.getElementById("startBtn");
-      const pauseBtn = document.getElementById("pauseBtn");
-      const resumeBtn = document.getElementById("resumeBtn");
-      const resetBtn = document.getElementById("resetBtn");
-      const lapBtn = document.getElementById("lapBtn");
-      const progress = document.getElementById("progress");
-      const sub = document.getElementById("sub");
-      const laps = document.getElementById("laps");
-      const lapList = document.getElementById("lapList");
-
-      // shared timer state (ms)
-      let state = {{
-        totalMs: mode === "countdown" ? initialSeconds * 1000 : 0,
-        remainingMs: mode === "countdown" ? initialSeconds * 1000 : 0,
-        elapsedMs: 0,            // used by stopwatch
-        running: false,
-        lastPerfStart: null,
-        rafId: null,
-        lapsArr: []
-      }};
-
-      function formatMs(ms) {{
-        const totalSec = Math.max(0, Math.round(ms / 1000));
-        const h = Math.floor(totalSec / 3600);
-        const m = Math.floor((totalSec % 3600) / 60);
-        const s = totalSec % 60;
-        if (h > 0) {{
-          return `${{String(h).padStart(2,'0')}}:${{String(m).padStart(2,'0')}}:${{String(s).padStart(2,'0')}}`;
-        }}
-        return `${{String(m).padStart(2,'0')}}:${{String(s).padStart(2,'0')}}`;
-      }}
-
-      function updateUI() {{
-        if (mode === "countdown") {{
-          display.textContent = formatMs(state.remainingMs);
-          const pct = state.totalMs ? Math.round(((state.totalMs - state.remainingMs) / state.totalMs) * 100) : 0;
-          progress.style.width = pct + "%";
-        }} else {{
-          display.textContent = formatMs(state.elapsedMs);
-          if (capSeconds > 0) {{
-            const pct = Math.min(100, Math.round((state.elapsedMs / (capSeconds * 1000)) * 100));
-            progress.style.width = pct + "%";
-          }} else {{
-            // make progress a subtle pulse for stopwatch (or clear)
-            progress.style.width = "100%";
-          }}
-        }}
-      }}
-
-      function tick() {{
-        if (!state.running) return;
-        const now = performance.now();
-        if (mode === "countdown") {{
-          const elapsed = now - state.lastPerfStart;
-          state.remainingMs = Math.max(0, state.totalMs - elapsed);
-          updateUI();
-          if (state.remainingMs <= 0) {{
-            state.running = false;
-            sub.textContent = "✅ Session complete!";
-            pauseBtn.style.display = "none";
-            resumeBtn.style.display = "none";
-            startBtn.style.display = "inline-block";
-            cancelAnimationFrame(state.rafId);
-            return;
-          }}
-        }} else {{
-          // stopwatch mode: elapsedMs = priorElapsed + (now - lastPerfStart)
-          state.elapsedMs = state.priorElapsed + (now - state.lastPerfStart);
-          // optional cap handling:
-          if (capSeconds > 0 && state.elapsedMs >= capSeconds * 1000) {{
-            state.elapsedMs = capSeconds * 1000;
-            state.running = false;
-            sub.textContent = "⏹ Reached cap";
-            pauseBtn.style.display = "none";
-            resumeBtn.style.display = "none";
-            startBtn.style.display = "inline-block";
-            cancelAnimationFrame(state.rafId);
-            updateUI();
-            return;
-          }}
-          updateUI();
-        }}
-        state.rafId = requestAnimationFrame(tick);
-      }}
-
-      // Button behaviors
-      startBtn.onclick = function() {{
-        if (mode === "countdown") {{
-          state.totalMs = initialSeconds * 1000;
-          state.remainingMs = state.totalMs;
-          state.lastPerfStart = performance.now();
-          state.running = true;
-          startBtn.style.display = "none";
-          pauseBtn.style.display = "inline-block";
-          resumeBtn.style.display = "none";
-          sub.textContent = "";
-          updateUI();
-          state.rafId = requestAnimationFrame(tick);
-        }} else {{
-          // stopwatch: start from zero
-          state.priorElapsed = 0;
-          state.elapsedMs = 0;
-          state.lastPerfStart = performance.now();
-          state.running = true;
-          startBtn.style.display = "none";
-          pauseBtn.style.display = "inline-block";
-          resumeBtn.style.display = "none";
-          lapBtn.style.display = "inline-block";
-          laps.style.display = "block";
-          state.lapsArr = [];
-          lapList.innerHTML = "";
-          sub.textContent = "";
-          updateUI();
-          state.rafId = requestAnimationFrame(tick);
-        }}
-      }};
-
-      pauseBtn.onclick = function() {{
-        if (!state.running) return;
-        state.running = false;
-        cancelAnimationFrame(state.rafId);
-        if (mode === "countdown") {{
-          // freeze remaining based on elapsed
-          const elapsed = performance.now() - state.lastPerfStart;
-          state.remainingMs = Math.max(0, state.totalMs - elapsed);
-        }} else {{
-          // record priorElapsed
-          state.priorElapsed = state.elapsedMs;
-        }}
-        pauseBtn.style.display = "none";
-        resumeBtn.style.display = "inline-block";
-        sub.textContent = "⏸ Paused";
-      }};
-
-      resumeBtn.onclick = function() {{
-        if (state.running) return;
-        state.lastPerfStart = performance.now();
-        state.running = true;
-        pauseBtn.style.display = "inline-block";
-        resumeBtn.style.display = "none";
-        sub.textContent = "";
-        state.rafId = requestAnimationFrame(tick);
-      }};
-
-      resetBtn.onclick = function() {{
-        // stop and reset everything
-        state.running = false;
-        cancelAnimationFrame(state.rafId);
-        if (mode === "countdown") {{
-          state.totalMs = initialSeconds * 1000;
-          state.remainingMs = state.totalMs;
-        }} else {{
-          state.priorElapsed = 0;
-          state.elapsedMs = 0;
-          state.lapsArr = [];
-          lapList.innerHTML = "";
-          laps.style.display = "none";
-          lapBtn.style.display = "none";
-        }}
-        pauseBtn.style.display = "none";
-        resumeBtn.style.display = "none";
-        startBtn.style.display = "inline-block";
-        sub.textContent = "";
-        updateUI();
-      }};
-
-      lapBtn.onclick = function() {{
-        if (mode !== "stopwatch") return;
-        // record a lap using current elapsed time
-        const label = formatMs(state.elapsedMs);
-        state.lapsArr.push(label);
-        const li = document.createElement("li");
-        li.textContent = label;
-        lapList.insertBefore(li, lapList.firstChild);
-      }};
-
-      // UI init depending on mode
-      if (mode === "countdown") {{
-        lapBtn.style.display = "none";
-        laps.style.display = "none";
-        pauseBtn.style.display = "none";
-        resumeBtn.style.display = "none";
-        startBtn.style.display = "inline-block";
-        state.totalMs = initialSeconds * 1000;
-        state.remainingMs = state.totalMs;
-        updateUI();
-      }} else {{
-        // stopwatch init
-        lapBtn.style.display = "none";
-        laps.style.display = "none";
-        pauseBtn.style.display = "none";
-        resumeBtn.style.display = "none";
-        startBtn.style.display = "inline-block";
-        state.priorElapsed = 0;
-        state.elapsedMs = 0;
-        updateUI();
-      }}
-    }})();
-    </script>
-    """
+    # the timer template is cached in assets; only these three values change between reruns
+    html = assets.focus_timer(mode_js, initial_seconds, cap_seconds)
 
     # render component
     components.html(html, height=460, scrolling=False)
 
 # ---------- ROUTER ----------
-if st.session_state.page == "home":
-    home_ui()
-elif st.session_state.page == "login":
-    login_ui()
-elif st.session_state.page == "signup":
-    signup_ui()
-elif st.session_state.page == "dashboard":
-    if st.session_state.user:
-        dashboard_ui()
-    else:
-        go_to("home")
-elif st.session_state.page == "visualizer":
-    if st.session_state.user:
-        graphs_ui()
-    else:
-        go_to("home")
-elif st.session_state.page == "focus":
-    if st.session_state.user:
-        focus_ui()
-    else:
-        go_to("home")
-
+try:
+    if st.session_state.page == "home":
+        home_ui()
+    elif st.session_state.page == "login":
+        login_ui()
+    elif st.session_state.page == "signup":
+        signup_ui()
+    elif st.session_state.page == "dashboard":
+        if st.session_state.user:
+            dashboard_ui()
+        else:
+            go_to("home")
+    elif st.session_state.page == "visualizer":
+        if st.session_state.user:
+            graphs_ui()
+        else:
+            go_to("home")
+    elif st.session_state.page == "focus":
+        if st.session_state.user:
+            focus_ui()
+        else:
+            go_to("home")
+finally:
+    # st.rerun() / go_to() end the run with an exception, so collect stats here
+    _query_stats = db.stop_query_stats()
+    if _query_stats is not None:
+        st.session_state["_last_query_stats"] = _query_stats.to_dict()
+    _spans = perf.stop()
+    if _spans is not None:
+        st.session_state["_last_spans"] = _spans.to_dict()
+        st.session_state["_last_spans_trace"] = _spans.to_chrome_trace_json()
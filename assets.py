@@ -0,0 +1,56 @@
+# assets.py
+"""
+Static CSS/HTML for the pages, read from static/ once per process.
+
+app.py is re-executed on every rerun, so strings built at its module level (or inside
+the page functions) are rebuilt every time. These loaders live in an imported module
+instead: each file is read and compacted once, and the focus timer only substitutes
+its three dynamic values into the cached template.
+"""
+import os
+import re
+import json
+import functools
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+FOCUS_CONFIG_TOKEN = "__FOCUS_CONFIG__"
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE = re.compile(r"\s+")
+_CSS_PUNCT = re.compile(r"\s*([{};,>])\s*")
+
+
+def _compact_css(css: str) -> str:
+    css = _CSS_COMMENT.sub("", css)
+    css = _CSS_SPACE.sub(" ", css)
+    return _CSS_PUNCT.sub(r"\1", css).strip()
+
+
+def _compact_html(html: str) -> str:
+    # drop indentation and blank lines only; newlines stay, so inline JS keeps its line breaks
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+@functools.lru_cache(maxsize=None)
+def text(name: str) -> str:
+    """Contents of static/<name>, compacted by file type."""
+    with open(os.path.join(STATIC_DIR, name), encoding="utf-8") as fh:
+        raw = fh.read()
+    if name.endswith(".css"):
+        return _compact_css(raw)
+    if name.endswith(".html"):
+        return _compact_html(raw)
+    return raw
+
+
+@functools.lru_cache(maxsize=None)
+def style(name: str) -> str:
+    """A static CSS file wrapped in <style> for st.markdown(..., unsafe_allow_html=True)."""
+    return f"<style>{text(name)}</style>"
+
+
+@functools.lru_cache(maxsize=64)
+def focus_timer(mode: str, initial_seconds: int, cap_seconds: int) -> str:
+    """The focus timer component with its settings injected (same settings -> same string)."""
+    config = json.dumps({"mode": mode, "initialSeconds": int(initial_seconds), "capSeconds": int(cap_seconds)})
+    return text("focus_timer.html").replace(FOCUS_CONFIG_TOKEN, config)
@@ -0,0 +1,65 @@
+# bench/bench_bulk.py
+"""
+Per-row utils calls versus the batch APIs (create_tasks, update_tasks, mark_tasks_missed).
+
+    python bench/bench_bulk.py --rows 10000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOALS_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_bulk.db"))
+
+import db  # noqa: E402
+import utils  # noqa: E402
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"{label:<34} {elapsed:10.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    n = args.rows
+
+    utils.create_user("bench", "bench@example.com", "x")
+    user_id = utils.login_user("bench@example.com", "x")["id"]
+    goal_id = utils.create_goal(user_id, "bench", "", "2024-01-01", None, "work")
+    specs = [{"goal_id": goal_id, "title": f"task {i}", "notes": "", "due_date": "2024-01-03"} for i in range(n)]
+
+    print(f"db={db.DB_PATH} rows={n}")
+    single_ids = []
+    timed("create_task x N", lambda: single_ids.extend(
+        utils.create_task(s["goal_id"], s["title"], s["notes"], s["due_date"]) for s in specs))
+    batch_ids = []
+    timed("create_tasks (batch)", lambda: batch_ids.extend(utils.create_tasks(specs)))
+
+    timed("update_task x N", lambda: [utils.update_task(i, "t", "", "2024-01-04", True) for i in single_ids])
+    timed("update_tasks (batch)", lambda: utils.update_tasks(
+        [{"id": i, "title": "t", "notes": "", "due_date": "2024-01-04", "completed": True} for i in batch_ids]))
+
+    def mark_loop(ids):
+        # the previous mark_tasks_missed: one UPDATE per id
+        conn = db.get_connection()
+        try:
+            for tid in ids:
+                conn.execute("UPDATE tasks SET missed=1 WHERE id=?", (tid,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    timed("mark missed, UPDATE per id", lambda: mark_loop(single_ids))
+    timed("mark_tasks_missed (batch)", lambda: utils.mark_tasks_missed(batch_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench/bench_connections.py
+"""
+Connections opened and latency for one simulated dashboard rerun.
+
+Replays the utils calls dashboard_ui makes for a user with N goals, once with
+pooling disabled (GOALS_DB_POOL_SIZE=0, i.e. the old connect-per-call
+behaviour) and once with the default pool.
+
+    python bench/bench_connections.py --goals 20 --tasks 5 --reruns 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOALS_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_connections.db"))
+
+import db  # noqa: E402
+import utils  # noqa: E402
+
+WEEK = "2024-01-01"
+
+
+def seed(n_goals, n_tasks):
+    conn = db.get_connection()
+    try:
+        cur = conn.execute("INSERT INTO users (name, email, password) VALUES ('bench', 'bench@example.com', 'x')")
+        user_id = cur.lastrowid
+        for g in range(n_goals):
+            gid = conn.execute(
+                "INSERT INTO goals (user_id, title, week_start, category) VALUES (?, ?, ?, 'work')",
+                (user_id, f"goal {g}", WEEK),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO tasks (goal_id, title, due_date, completed) VALUES (?, ?, '2024-01-03', ?)",
+                [(gid, f"task {t}", t % 2) for t in range(n_tasks)],
+            )
+        conn.commit()
+        return user_id
+    finally:
+        conn.close()
+
+
+def dashboard_rerun(user_id):
+    """The data calls of one dashboard_ui run."""
+    goals = utils.get_goals_for_week(user_id, WEEK)
+    utils.weekly_summary(user_id, WEEK)
+    for g in goals.itertuples():
+        utils.goal_progress(utils.get_tasks_for_goal(g.id))
+    utils.get_missed_tasks(user_id, WEEK)
+    for g in utils.get_goals_for_week(user_id, WEEK).itertuples():
+        utils.goal_progress(utils.get_tasks_for_goal(g.id))
+
+
+def run(label, pool_size, user_id, reruns):
+    db.close_pool()
+    db.POOL_SIZE = pool_size
+    dashboard_rerun(user_id)  # warm-up
+    pools = (db.get_pool(), db.get_read_pool())
+    opened_before = sum(p.stats["opened"] for p in pools)
+    timings = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        dashboard_rerun(user_id)
+        timings.append((time.perf_counter() - t0) * 1000)
+    opened = (sum(p.stats["opened"] for p in pools) - opened_before) / reruns
+    print(f"{label:<10} connections/rerun={opened:6.1f}  "
+          f"median={statistics.median(timings):7.2f} ms  "
+          f"p95={sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--goals", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    user_id = seed(args.goals, args.tasks)
+    print(f"db={db.DB_PATH} goals={args.goals} tasks/goal={args.tasks} reruns={args.reruns}")
+    run("unpooled", 0, user_id, args.reruns)
+    run("pooled", int(os.environ.get("GOALS_DB_POOL_SIZE", "5")) or 5, user_id, args.reruns)
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
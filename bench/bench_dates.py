@@ -0,0 +1,100 @@
+# bench/bench_dates.py
+"""
+date(t.due_date) < date(?) versus the sargable t.due_date < ? on a large database.
+
+Builds (once) a database with --tasks tasks spread over --users users and
+52 weeks, then times get_missed_tasks / detect_missed_tasks_from_week style
+queries with both predicates.
+
+    python bench/bench_dates.py --tasks 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+GOALS_PER_WEEK = 4
+
+
+def build(path, n_tasks, n_users):
+    db.migrate(path)
+    conn = db._open_connection(path)
+    n_goals = max(1, n_tasks // 5)
+    conn.executescript(f"""
+        PRAGMA synchronous = OFF;
+        BEGIN;
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {n_users})
+        INSERT INTO users (id, name, email, password) SELECT i, 'u' || i, 'u' || i || '@x', 'x' FROM n;
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {n_goals - 1})
+        INSERT INTO goals (id, user_id, title, week_start, category)
+        SELECT i + 1, i % {n_users} + 1, 'goal ' || i,
+               date('2023-01-02', '+' || ((i / {n_users} / {GOALS_PER_WEEK}) % 52 * 7) || ' days'),
+               CASE i % 3 WHEN 0 THEN 'work' WHEN 1 THEN 'study' ELSE 'personal' END
+        FROM n;
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {n_tasks - 1})
+        INSERT INTO tasks (goal_id, title, due_date, completed, missed)
+        SELECT i % {n_goals} + 1, 'task ' || i,
+               CASE WHEN i % 47 = 0 THEN NULL
+                    ELSE date((SELECT week_start FROM goals WHERE id = i % {n_goals} + 1), '+' || (i % 7) || ' days') END,
+               (i % 3 = 0), (i % 17 = 0)
+        FROM n;
+        COMMIT;
+    """)
+    conn.close()
+
+
+QUERIES = {
+    "get_missed_tasks": """
+        SELECT t.id, t.title, t.due_date, g.title AS goal_title
+        FROM tasks t JOIN goals g ON g.id = t.goal_id
+        WHERE g.user_id = ? AND t.completed = 0 AND {pred}""",
+    "detect_missed_tasks_from_week": """
+        SELECT t.*, g.title AS goal_title, g.week_start
+        FROM tasks t JOIN goals g ON t.goal_id = g.id
+        WHERE g.user_id = ? AND g.week_start = '2023-06-05' AND t.completed = 0 AND {pred}
+          AND t.carried_over = 0 AND t.missed = 0
+        ORDER BY t.due_date""",
+}
+PREDICATES = {
+    "date() on column": "date(t.due_date) < date(?)",
+    "sargable range": "t.due_date < ?",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--db", default=None, help="reuse/build this database file")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.gettempdir(), f"bench_dates_{args.tasks}.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        build(path, args.tasks, args.users)
+        print(f"built {path} in {time.perf_counter() - t0:.1f}s")
+    else:
+        db.migrate(path)
+
+    conn = db._open_connection(path)
+    for qname, template in QUERIES.items():
+        for pname, pred in PREDICATES.items():
+            sql = template.format(pred=pred)
+            timings = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                rows = conn.execute(sql, (1, "2023-06-12")).fetchall()
+                timings.append((time.perf_counter() - t0) * 1000)
+            print(f"{qname:<30} {pname:<17} rows={len(rows):6d} median={statistics.median(timings):8.2f} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# bench/bench_pages.py
+"""
+End-to-end script run time per page, without a browser.
+
+Drives app.py through streamlit.testing.v1.AppTest with a logged-in session on a
+synthetic database (bench/synth.py) and records, for home_ui, dashboard_ui,
+graphs_ui and focus_ui: wall time of the first and of repeated reruns, SQL
+statements per run (the app's own "Record SQL per rerun" stats) and peak Python
+memory of one rerun (tracemalloc, measured in a separate untimed pass). It then
+replays common dashboard interactions: ticking a task checkbox, switching week
+and changing the category filter.
+
+    python bench/bench_pages.py --tasks 100k --runs 20 --out pages.json
+
+Times include AppTest's own element bookkeeping, so compare them with each other
+or across commits, not with browser timings.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+from datetime import datetime
+
+# no background rollover thread competing with the measured runs
+os.environ["GOALS_ROLLOVER_INTERVAL"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit.logger  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import db  # noqa: E402
+import synth  # noqa: E402
+from bench_utils import summarize, git_commit, copy_database, parse_count  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAGES = {"home": "home_ui", "dashboard": "dashboard_ui", "visualizer": "graphs_ui", "focus": "focus_ui"}
+CATEGORY_OPTIONS = ["All", "Personal", "Work", "Study"]
+
+
+def new_session(page, user_id, week, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["user"] = {"id": user_id, "name": f"user {user_id}", "email": f"user{user_id}@bench.local"}
+    at.session_state["page"] = page
+    at.session_state["current_monday"] = week
+    at.session_state["perf_record_sql"] = True
+    return at
+
+
+def timed_run(at):
+    """Run the script once; return (ms, SQL statements)."""
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    stats = at.session_state["_last_query_stats"] if "_last_query_stats" in at.session_state else {}
+    return elapsed, stats.get("count", 0)
+
+
+def peak_kib(at):
+    tracemalloc.start()
+    try:
+        at.run()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(at, step, runs):
+    """Apply step(at, k) before each of `runs` timed reruns; return the summary dict."""
+    timings, statements = [], []
+    for k in range(runs):
+        step(at, k)
+        ms, count = timed_run(at)
+        timings.append(ms)
+        statements.append(count)
+    out = summarize(timings)
+    out["sql_statements"] = max(statements)
+    return out
+
+
+def bench_page(page, user_id, week, runs, timeout):
+    at = new_session(page, user_id, week, timeout)
+    first_ms, first_sql = timed_run(at)
+    out = measure(at, lambda at, k: None, runs)
+    out["first_run_ms"] = round(first_ms, 3)
+    out["first_run_sql_statements"] = first_sql
+    out["peak_kib"] = peak_kib(at)
+    return out
+
+
+def toggle_task(at, k):
+    boxes = [cb for cb in at.checkbox if cb.key and cb.key.startswith("task_cb_")]
+    if not boxes:
+        raise RuntimeError("no task checkboxes on the dashboard; pick a week with tasks")
+    box = boxes[0]
+    box.set_value(not box.value)
+
+
+def switch_week(at, k):
+    label = "Next Week ⟶" if k % 2 == 0 else "⟵ Prev Week"
+    next(b for b in at.button if b.label == label).click()
+
+
+def change_category(at, k):
+    at.selectbox(key="dashboard_filter_category").select(CATEGORY_OPTIONS[(k + 1) % len(CATEGORY_OPTIONS)])
+
+
+INTERACTIONS = {
+    "toggle_task_checkbox": toggle_task,
+    "switch_week": switch_week,
+    "change_category_filter": change_category,
+}
+
+
+def bench_interaction(step, user_id, week, runs, timeout):
+    at = new_session("dashboard", user_id, week, timeout)
+    timed_run(at)
+    out = measure(at, step, runs)
+    step(at, runs)
+    out["peak_kib"] = peak_kib(at)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synth.add_spec_arguments(parser, tasks=False)
+    parser.add_argument("--tasks", default="100k", help="database size, e.g. 10k or 1m")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--user", type=int, default=1)
+    parser.add_argument("--week", type=int, default=None, help="week index to open (default: the middle week)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest timeout per run, seconds")
+    parser.add_argument("--out", help="write the JSON result here (default: stdout)")
+    args = parser.parse_args()
+
+    # AppTest runs the script in this process, where Streamlit logs to stderr freely
+    streamlit.logger.set_log_level(logging.ERROR)
+    spec = synth.spec_from_args(argparse.Namespace(**dict(vars(args), tasks=parse_count(args.tasks))))
+    base = synth.ensure(spec)
+    scratch = base[:-3] + ".pages.db"
+    copy_database(base, scratch)
+    # app.py imports this same db module, so its pools open the scratch copy
+    db.close_pool()
+    db.DB_PATH = scratch
+    week = synth.week_of(spec["weeks"] // 2 if args.week is None else args.week)
+
+    result = {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "spec": spec,
+        "tasks": synth.task_count(spec),
+        "user": args.user,
+        "week": week,
+        "runs": args.runs,
+        "pages": {},
+        "interactions": {},
+    }
+    try:
+        for page, fn in PAGES.items():
+            result["pages"][fn] = bench_page(page, args.user, week, args.runs, args.timeout)
+            print(f"done: {fn}", file=sys.stderr)
+        for name, step in INTERACTIONS.items():
+            result["interactions"][name] = bench_interaction(step, args.user, week, args.runs, args.timeout)
+            print(f"done: {name}", file=sys.stderr)
+    finally:
+        db.close_pool()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(scratch + suffix):
+                os.remove(scratch + suffix)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench/bench_payload.py
+"""
+Element payload bytes per rerun, per page.
+
+Runs each page through AppTest (logged in, on a synthetic database) and sums the
+serialized protobuf size of every element the rerun produced: markdown bodies,
+CSS blocks, component HTML, widgets. That is what the server sends to the browser
+for the page on every rerun, minus the websocket framing.
+
+    python bench/bench_payload.py --tasks 10k
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+os.environ["GOALS_ROLLOVER_INTERVAL"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit.logger  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import db  # noqa: E402
+import synth  # noqa: E402
+from bench_utils import copy_database, parse_count  # noqa: E402
+from bench_pages import APP_PATH, PAGES  # noqa: E402
+
+PAGES = dict(PAGES, login="login_ui")
+
+
+def payload_bytes(node):
+    """Serialized size of every leaf element under an AppTest tree node."""
+    children = getattr(node, "children", None)
+    if children is None:
+        proto = getattr(node, "proto", None)
+        return len(proto.SerializeToString()) if proto is not None else 0
+    return sum(payload_bytes(child) for child in children.values())
+
+
+def page_bytes(page, user_id, week):
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["page"] = page
+    at.session_state["current_monday"] = week
+    if page != "login":
+        at.session_state["user"] = {"id": user_id, "name": f"user {user_id}", "email": f"user{user_id}@bench.local"}
+    at.run()
+    at.run()  # a rerun, not the first run
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return payload_bytes(at._tree)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synth.add_spec_arguments(parser, tasks=False)
+    parser.add_argument("--tasks", default="10k", help="database size, e.g. 10k")
+    parser.add_argument("--user", type=int, default=1)
+    args = parser.parse_args()
+
+    streamlit.logger.set_log_level(logging.ERROR)
+    spec = synth.spec_from_args(argparse.Namespace(**dict(vars(args), tasks=parse_count(args.tasks))))
+    base = synth.ensure(spec)
+    scratch = base[:-3] + ".payload.db"
+    copy_database(base, scratch)
+    db.close_pool()
+    db.DB_PATH = scratch
+    week = synth.week_of(spec["weeks"] // 2)
+    try:
+        result = {fn: page_bytes(page, args.user, week) for page, fn in PAGES.items()}
+    finally:
+        db.close_pool()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(scratch + suffix):
+                os.remove(scratch + suffix)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench/bench_progress.py
+"""
+goal_progress before and after vectorizing, and goals_progress for every goal at once,
+on a synthetic task frame (no database involved).
+
+    python bench/bench_progress.py --tasks 100000 --goals 5000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+
+
+def old_goal_progress(tasks_df):
+    # the previous implementation: per-row apply, mutates its input, counts missed tasks
+    if tasks_df is None or tasks_df.empty:
+        return 0
+    tasks_df["completed"] = tasks_df["completed"].apply(
+        lambda x: True if str(x).lower() in ["1", "true", "yes"] else False
+    )
+    total = len(tasks_df)
+    done = tasks_df["completed"].sum()
+    return round((done / total) * 100)
+
+
+def make_tasks(n, goals, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "goal_id": rng.integers(1, goals + 1, n),
+        "completed": rng.integers(0, 2, n),
+        "missed": (rng.random(n) < 0.1).astype(int),
+    })
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"{label:<40} {elapsed:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--goals", type=int, default=5_000)
+    args = parser.parse_args()
+
+    df = make_tasks(args.tasks, args.goals)
+    groups = [g for _, g in df.groupby("goal_id")]
+    print(f"tasks={len(df)} goals={len(groups)}")
+
+    timed("old goal_progress, whole frame", lambda: old_goal_progress(df.copy()))
+    timed("goal_progress, whole frame", lambda: utils.goal_progress(df))
+    timed("old goal_progress per goal", lambda: [old_goal_progress(g.copy()) for g in groups])
+    per_goal = timed("goal_progress per goal", lambda: [utils.goal_progress(g) for g in groups])
+    batched = timed("goals_progress (one groupby)", lambda: utils.goals_progress(df))
+
+    assert batched.tolist() == per_goal, "goals_progress disagrees with goal_progress"
+    assert df["completed"].dtype.kind == "i", "input frame was modified"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench/bench_startup.py
+"""
+Schema/startup cost: one-time migrate() versus the DDL every connection used to run.
+
+    python bench/bench_startup.py --runs 200
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def timed(fn, runs):
+    out = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_startup.db")
+
+    t0 = time.perf_counter()
+    db.migrate(path)
+    print(f"migrate (fresh file)          {(time.perf_counter() - t0) * 1000:8.3f} ms")
+    print(f"migrate (already current)     {timed(lambda: db.migrate(path), args.runs):8.3f} ms")
+
+    def connect_with_ddl():
+        # what every get_connection() call did before migrations existed
+        conn = db._open_connection(path)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        db._migration_001_base_schema(conn)
+        conn.commit()
+        db._show_schema(conn)
+        conn.close()
+
+    def connect_plain():
+        db._open_connection(path).close()
+
+    print(f"connect + DDL (old, per call) {timed(connect_with_ddl, args.runs):8.3f} ms")
+    print(f"connect only (new)            {timed(connect_plain, args.runs):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
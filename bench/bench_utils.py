@@ -0,0 +1,262 @@
+# bench/bench_utils.py
+"""
+Latency percentiles of the public utils data-layer functions on synthetic databases.
+
+For every size, builds (once, cached in the temp dir) a database with bench/synth.py,
+copies it to a scratch file so the write benchmarks never touch the cached build, and
+times each function --runs times over different users/weeks/goals, after one untimed
+warm-up call. Caches are cleared before every timed call, so a run measures SQL plus
+pandas rather than st.cache_data hits (--warm repeats one call with the caches left
+alone instead).
+
+    python bench/bench_utils.py --tasks 1k 100k 1m --runs 50 --out bench.json
+    python bench/bench_utils.py --tasks 100k --compare bench.json     # after a change
+
+--compare prints the p50/p95 ratio against an earlier JSON result and exits 1 if any
+function got slower than --threshold (default 1.25x).
+"""
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+import streamlit.logger  # noqa: E402
+
+# st.cache_data warns about the missing Streamlit runtime at import and on every call
+streamlit.logger.set_log_level(logging.ERROR)
+
+import db  # noqa: E402
+import utils  # noqa: E402
+import synth  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTILES = (50, 95, 99)
+
+SQL_OPEN_TASKS = """
+    SELECT t.id FROM tasks t JOIN goals g ON g.id = t.goal_id
+    WHERE g.user_id = ? AND g.week_start = ? AND t.completed = 0 AND t.missed = 0 AND t.carried_over = 0
+"""
+
+
+def parse_count(text):
+    """'1k' -> 1000, '10m' -> 10000000, '2500' -> 2500."""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    out = {"n": len(timings)}
+    for q in PERCENTILES:
+        out[f"p{q}_ms"] = round(percentile(timings, q), 3)
+    out["mean_ms"] = round(sum(timings) / len(timings), 3)
+    out["max_ms"] = round(timings[-1], 3)
+    return out
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def copy_database(src, dst):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(dst + suffix):
+            os.remove(dst + suffix)
+    source, target = sqlite3.connect(src), sqlite3.connect(dst)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def use_database(path):
+    """Point db/utils at `path` with fresh pools and empty caches."""
+    db.close_pool()
+    db.DB_PATH = path
+    reset_caches()
+
+
+def reset_caches():
+    st.cache_data.clear()
+    utils._week_cache.clear()
+
+
+def target(spec, k):
+    """Deterministic (user_id, week index) for call k: walks every user before moving a week."""
+    return k % spec["users"] + 1, (k // spec["users"]) % max(1, spec["weeks"] - 1)
+
+
+def goal_id(spec, user_id, week_index, slot=0):
+    # synth numbers goals user-major, then week, then slot
+    return ((user_id - 1) * spec["weeks"] + week_index) * spec["goals_per_week"] + slot + 1
+
+
+def open_task_ids(user_id, week):
+    conn = db.get_read_connection()
+    try:
+        return [r[0] for r in conn.execute(SQL_OPEN_TASKS, (user_id, week))]
+    finally:
+        conn.close()
+
+
+def cases(spec):
+    """name -> prepare(k), where prepare does untimed setup and returns the call to time."""
+    def goals_for_week(k):
+        user_id, w = target(spec, k)
+        return lambda: utils.get_goals_for_week(user_id, synth.week_of(w))
+
+    def tasks_for_goal(k):
+        user_id, w = target(spec, k)
+        gid = goal_id(spec, user_id, w, k % spec["goals_per_week"])
+        return lambda: utils.get_tasks_for_goal(gid)
+
+    def weekly_summary(k):
+        user_id, w = target(spec, k)
+        return lambda: utils.weekly_summary(user_id, synth.week_of(w))
+
+    def missed_tasks(k):
+        user_id, w = target(spec, k)
+        return lambda: utils.get_missed_tasks(user_id, synth.week_of(w))
+
+    def detect_missed(k):
+        user_id, w = target(spec, k)
+        return lambda: utils.detect_missed_tasks_from_week(user_id, synth.week_of(w), synth.week_of(w + 1))
+
+    def carry_over(k):
+        user_id, w = target(spec, k)
+        ids = open_task_ids(user_id, synth.week_of(w))
+        return lambda: utils.carry_over_selected_tasks(ids, synth.week_of(w), synth.week_of(w + 1), user_id)
+
+    def goal_completed(k):
+        user_id, w = target(spec, k)
+        gid = goal_id(spec, user_id, w, k % spec["goals_per_week"])
+        return lambda: utils.mark_goal_completed(gid, k % 2 == 0)
+
+    # reads first: the two writers change the scratch copy
+    return {
+        "get_goals_for_week": goals_for_week,
+        "get_tasks_for_goal": tasks_for_goal,
+        "weekly_summary": weekly_summary,
+        "get_missed_tasks": missed_tasks,
+        "detect_missed_tasks_from_week": detect_missed,
+        "carry_over_selected_tasks": carry_over,
+        "mark_goal_completed": goal_completed,
+    }
+
+
+def run_size(spec, runs, warm, only=None, scratch=None):
+    base = synth.ensure(spec)
+    scratch = scratch or base[:-3] + ".scratch.db"
+    t0 = time.perf_counter()
+    copy_database(base, scratch)
+    copied = time.perf_counter() - t0
+    use_database(scratch)
+
+    results = {}
+    for name, prepare in cases(spec).items():
+        if only and name not in only:
+            continue
+        timings = []
+        # one untimed call first: lazy imports, pool connections and SQLite's page cache
+        # would otherwise land in the first sample (and, with few runs, in the p95)
+        call = prepare(0)
+        call()
+        for k in range(runs):
+            if not warm:
+                reset_caches()
+                call = prepare(k)
+            t0 = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[name] = summarize(timings)
+    db.close_pool()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(scratch + suffix):
+            os.remove(scratch + suffix)
+    return {"spec": spec, "tasks": synth.task_count(spec), "copy_s": round(copied, 2), "results": results}
+
+
+def compare(current, baseline, threshold):
+    """Print p50/p95 ratios per (size, function); return True if anything regressed past threshold."""
+    old = {(s["tasks"], name): r for s in baseline["sizes"] for name, r in s["results"].items()}
+    regressed = False
+    print(f"vs {baseline.get('commit')}: ratio = now / before")
+    for size in current["sizes"]:
+        for name, r in size["results"].items():
+            before = old.get((size["tasks"], name))
+            if not before:
+                continue
+            ratios = {q: r[q] / before[q] if before[q] else float("inf") for q in ("p50_ms", "p95_ms")}
+            flag = ""
+            if ratios["p50_ms"] > threshold:
+                flag, regressed = "  REGRESSION", True
+            print(f"{size['tasks']:>10} {name:<30} p50 {ratios['p50_ms']:5.2f}x  p95 {ratios['p95_ms']:5.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synth.add_spec_arguments(parser, tasks=False)
+    parser.add_argument("--tasks", nargs="+", default=["10k"], help="sizes to run, e.g. 1k 100k 10m")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--warm", action="store_true", help="time repeated cached calls instead of cold ones")
+    parser.add_argument("--only", nargs="+", help="only these functions")
+    parser.add_argument("--out", help="write the JSON result here (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "runs": args.runs,
+        "mode": "warm" if args.warm else "cold",
+        "sizes": [],
+    }
+    for size in args.tasks:
+        args_for_size = argparse.Namespace(**dict(vars(args), tasks=parse_count(size)))
+        spec = synth.spec_from_args(args_for_size)
+        result["sizes"].append(run_size(spec, args.runs, args.warm, args.only))
+        print(f"done: {synth.task_count(spec)} tasks", file=sys.stderr)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# bench/check_carry_parity.py
+"""
+Parity check for utils.carry_over_selected_tasks against the per-task loop it replaced.
+
+Seeds one database (random categories including NULL and mixed case, NULL and odd due
+dates, "Carried Over - ..." goals already present in the target week), then for each
+selection runs the old and the new implementation on two copies of it and compares the
+return value and every goals and tasks row. Exits 1 on the first mismatch.
+
+    python bench/check_carry_parity.py
+    python bench/check_carry_parity.py --seed 3 --goals 200
+"""
+import os
+import sys
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOALS_DB_PATH", os.path.join(tempfile.mkdtemp(), "check_carry_parity.db"))
+
+import db  # noqa: E402
+import utils  # noqa: E402
+from bench_utils import copy_database  # noqa: E402
+
+FROM_WEEK, TO_WEEK = "2024-01-01", "2024-01-08"
+CATEGORIES = ["work", "study", "personal", None, "Work"]
+DUE_DATES = ["2024-01-02", "2024-01-06", "2024-01-07", None]
+
+
+def legacy_carry_over(task_ids, from_week_iso, to_week_iso, user_id):
+    """carry_over_selected_tasks as it was before the set-based rewrite (two lookups per task)."""
+    if not task_ids:
+        return 0
+    conn = db.get_connection()
+    try:
+        cur = conn.cursor()
+        r = cur.execute(utils.SQL_CARRY_GOAL_LOOKUP, (user_id, to_week_iso, "Carried Over")).fetchone()
+        if r:
+            carried_goal_id, carried_cat = r[0], r[1] or "personal"
+        else:
+            cur.execute("INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
+                        (user_id, "Carried Over", f"Tasks carried from {from_week_iso}", to_week_iso, "personal"))
+            carried_goal_id = cur.lastrowid
+            carried_cat = "personal"
+
+        carried_count = 0
+        for tid in task_ids:
+            row = cur.execute("SELECT * FROM tasks WHERE id=?", (tid,)).fetchone()
+            if not row:
+                continue
+            orig_goal = cur.execute("SELECT category FROM goals WHERE id=?", (row["goal_id"],)).fetchone()
+            orig_cat = orig_goal["category"] if orig_goal and orig_goal["category"] else "personal"
+
+            try:
+                weekday = datetime.strptime(row["due_date"], "%Y-%m-%d").date().weekday()
+                to_monday = datetime.strptime(to_week_iso, "%Y-%m-%d").date()
+                new_due_iso = (to_monday + timedelta(days=weekday)).strftime("%Y-%m-%d")
+            except Exception:
+                new_due_iso = to_week_iso
+
+            target_goal_id = carried_goal_id
+            if orig_cat != carried_cat:
+                title_candidate = f"Carried Over - {orig_cat.title()}"
+                r2 = cur.execute(utils.SQL_CARRY_GOAL_LOOKUP, (user_id, to_week_iso, title_candidate)).fetchone()
+                if r2:
+                    target_goal_id = r2[0]
+                else:
+                    cur.execute("INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
+                                (user_id, title_candidate, f"Tasks carried from {from_week_iso}", to_week_iso, orig_cat))
+                    target_goal_id = cur.lastrowid
+
+            cur.execute("""
+                INSERT INTO tasks (goal_id, title, notes, due_date, carried_over, carried_from_week)
+                VALUES (?, ?, ?, ?, 1, ?)
+            """, (target_goal_id, row["title"], row["notes"], new_due_iso, from_week_iso))
+            cur.execute("UPDATE tasks SET missed=1 WHERE id=?", (tid,))
+            carried_count += 1
+
+        conn.commit()
+        return carried_count
+    finally:
+        conn.close()
+
+
+def seed(path, rng, goals):
+    """One user, `goals` goals in FROM_WEEK with 0-5 tasks each, two carry goals already in TO_WEEK."""
+    db.migrate(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("INSERT INTO users (id, name, email, password) VALUES (1, 'parity', 'parity@bench.local', 'x')")
+        for g in range(goals):
+            goal = conn.execute("INSERT INTO goals (user_id, title, week_start, category) VALUES (1, ?, ?, ?)",
+                                (f"goal {g}", FROM_WEEK, rng.choice(CATEGORIES))).lastrowid
+            for t in range(rng.randint(0, 5)):
+                conn.execute("INSERT INTO tasks (goal_id, title, notes, due_date) VALUES (?, ?, ?, ?)",
+                             (goal, f"task {g}.{t}", rng.choice([None, "notes"]), rng.choice(DUE_DATES)))
+        # the same title twice: both versions must pick the lower id
+        for _ in range(2):
+            conn.execute("INSERT INTO goals (user_id, title, week_start, category) VALUES (1, 'Carried Over - Study', ?, 'study')",
+                         (TO_WEEK,))
+        conn.commit()
+        return [r[0] for r in conn.execute("SELECT id FROM tasks ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def snapshot(path):
+    conn = sqlite3.connect(path)
+    try:
+        return (
+            conn.execute("SELECT id, user_id, title, description, week_start, category FROM goals ORDER BY id").fetchall(),
+            conn.execute("""SELECT id, goal_id, title, notes, due_date, completed, carried_over, missed, carried_from_week
+                            FROM tasks ORDER BY id""").fetchall(),
+        )
+    finally:
+        conn.close()
+
+
+def run(fn, base, path, selection):
+    copy_database(base, path)
+    db.close_pool()
+    db.DB_PATH = path
+    utils._week_cache.clear()
+    count = fn(selection, FROM_WEEK, TO_WEEK, 1)
+    db.close_pool()
+    return count, snapshot(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--goals", type=int, default=40, help="goals in the source week")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp()
+    base = os.path.join(workdir, "seed.db")
+    task_ids = seed(base, rng, args.goals)
+    missing = max(task_ids, default=0) + 1000
+    selections = {
+        "empty": [],
+        "one": rng.sample(task_ids, 1),
+        "some": rng.sample(task_ids, min(5, len(task_ids))),
+        "all": list(task_ids),
+        "unknown id only": [missing],
+        "with unknown id": rng.sample(task_ids, min(3, len(task_ids))) + [missing],
+        "duplicates": task_ids[:3] + task_ids[:2],
+    }
+
+    failures = []
+    for name, selection in selections.items():
+        old = run(legacy_carry_over, base, os.path.join(workdir, "old.db"), selection)
+        new = run(utils.carry_over_selected_tasks, base, os.path.join(workdir, "new.db"), selection)
+        ok = old == new
+        print(f"[{'ok' if ok else 'FAIL'}] {name:<16} carried {old[0]} (old) / {new[0]} (new)")
+        if not ok:
+            failures.append(name)
+
+    if failures:
+        print(f"{len(failures)} selection(s) differ: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bench/check_imports.py
+"""
+Import-time budget: fails (exit 1) when a module gets slower to import than its budget
+or pulls in a heavy dependency it is supposed to load lazily.
+
+Each module is imported in a fresh interpreter under `python -X importtime`; the best
+cumulative time of --runs attempts is compared with BUDGETS_MS. Then app.py runs through
+AppTest on the pages that draw no chart, which must not import plotly.express.
+
+    python bench/check_imports.py
+    python bench/check_imports.py --runs 5 --scale 2     # slower machine: double every budget
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cumulative import time, milliseconds
+BUDGETS_MS = {
+    "db": 50,
+    "perf": 20,
+    "utils": 150,
+    "rollover": 150,
+}
+# heavy modules that importing these must not load
+LAZY = {
+    "utils": ("pandas", "numpy", "bcrypt", "streamlit", "plotly.express"),
+    "rollover": ("pandas", "numpy", "bcrypt", "streamlit", "plotly.express"),
+}
+# (streamlit itself loads the base plotly package for its chart theme; plotly.express is the costly part)
+HEAVY = ("pandas", "numpy", "bcrypt", "streamlit", "plotly.express")
+CHARTLESS_PAGES = ("home", "login", "focus")
+
+PAGE_SCRIPT = """
+import sys, json
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.session_state["page"] = {page!r}
+if {page!r} != "login":
+    at.session_state["user"] = {{"id": 1, "name": "bench", "email": "bench@bench.local"}}
+at.run()
+print(json.dumps({{"exception": [e.value for e in at.exception], "plotly": "plotly.express" in sys.modules}}))
+"""
+
+
+def import_time_ms(module):
+    """(cumulative ms, heavy modules loaded) for `import module` in a fresh interpreter."""
+    code = f"import sys, json; import {module}; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR,
+                          capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative = int(parts[1]) / 1000
+    return cumulative, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def page_imports_plotly(page, env):
+    code = PAGE_SCRIPT.format(app=os.path.join(REPO_DIR, "app.py"), page=page)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["exception"]:
+        raise RuntimeError(f"{page}: {result['exception']}")
+    return result["plotly"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; the fastest counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    parser.add_argument("--skip-pages", action="store_true", help="only check module import times")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        samples = [import_time_ms(module) for _ in range(args.runs)]
+        best = min(ms for ms, _ in samples)
+        loaded = samples[0][1]
+        eager = [m for m in LAZY.get(module, ()) if m in loaded]
+        status = "ok" if best <= budget and not eager else "FAIL"
+        print(f"[{status}] import {module:<10} {best:7.1f} ms (budget {budget:.0f} ms)"
+              + (f"  loads {', '.join(eager)}" if eager else ""))
+        if status != "ok":
+            failures.append(module)
+
+    if not args.skip_pages:
+        env = dict(os.environ, GOALS_DB_PATH=os.path.join(tempfile.mkdtemp(), "check_imports.db"),
+                   GOALS_ROLLOVER_INTERVAL="0")
+        for page in CHARTLESS_PAGES:
+            plotly = page_imports_plotly(page, env)
+            print(f"[{'FAIL' if plotly else 'ok'}] page {page:<12} {'imports' if plotly else 'skips'} plotly.express")
+            if plotly:
+                failures.append(f"page {page}")
+
+    if failures:
+        print(f"{len(failures)} over budget: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# bench/synth.py
+"""
+Deterministic synthetic databases for the benchmarks.
+
+The same arguments always produce the same rows: every flag comes from an integer
+hash of the row number and --seed, not from a random generator. Rows are bulk
+inserted at schema version 3, before the trigger-maintained tables exist, and
+db.migrate() then backfills counters, rollups and due-date counts in one pass each,
+so building 10M tasks takes minutes instead of firing every trigger per row.
+
+    python bench/synth.py --users 100 --weeks 52 --goals-per-week 5 --tasks-per-goal 4
+    python bench/synth.py --tasks 1000000          # pick --users to reach ~1M tasks
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+START_WEEK = "2023-01-02"  # a Monday
+CATEGORIES = ("work", "study", "personal", "health")
+# last migration without triggers on goals/tasks; later ones backfill from existing rows
+BULK_SCHEMA = 3
+
+DEFAULTS = {
+    "users": 10,
+    "weeks": 52,
+    "goals_per_week": 5,
+    "tasks_per_goal": 4,
+    "completion": 0.6,
+    "miss": 0.1,
+    "seed": 0,
+}
+
+
+def spec_for_tasks(n_tasks, **overrides):
+    """A generator spec with DEFAULTS (plus overrides) and enough users for ~n_tasks tasks."""
+    spec = dict(DEFAULTS, **overrides)
+    per_user = spec["weeks"] * spec["goals_per_week"] * spec["tasks_per_goal"]
+    spec["users"] = max(1, math.ceil(n_tasks / per_user))
+    return spec
+
+
+def task_count(spec):
+    return spec["users"] * spec["weeks"] * spec["goals_per_week"] * spec["tasks_per_goal"]
+
+
+def default_path(spec):
+    """Cache file name that encodes the whole spec, so a changed spec never reuses a stale build."""
+    name = "bench_{users}u_{weeks}w_{goals_per_week}g_{tasks_per_goal}t_c{completion}_m{miss}_s{seed}.db".format(**spec)
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def week_of(index):
+    """ISO Monday of week `index` (0-based) in the generated range."""
+    return (date.fromisoformat(START_WEEK) + timedelta(weeks=index)).isoformat()
+
+
+def _hash_below(expr, salt, seed, ratio):
+    # multiplicative hash of the row number -> [0, 10000); deterministic and well spread
+    return f"((({expr}) * 2654435761 + {salt * 40503 + seed * 97}) % 4294967296) % 10000 < {int(ratio * 10000)}"
+
+
+def build(path, spec, quiet=False):
+    """Create `path` from `spec` (see DEFAULTS) and migrate it to the current schema."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    users, weeks = int(spec["users"]), int(spec["weeks"])
+    gpw, tpg, seed = int(spec["goals_per_week"]), int(spec["tasks_per_goal"]), int(spec["seed"])
+    n_goals = users * weeks * gpw
+    n_tasks = n_goals * tpg
+    t0 = time.perf_counter()
+
+    conn = db._open_connection(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        for number, _name, step in db.MIGRATIONS[:BULK_SCHEMA]:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(number)};")
+        conn.commit()
+        categories = " ".join(f"WHEN {i} THEN '{c}'" for i, c in enumerate(CATEGORIES))
+        # goals are numbered user-major, then week, then slot: goal g belongs to user
+        # g / (weeks * gpw) + 1 and week (g / gpw) % weeks; task i belongs to goal i / tpg
+        conn.executescript(f"""
+            PRAGMA synchronous = OFF;
+            BEGIN;
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {users})
+            INSERT INTO users (id, name, email, password)
+            SELECT i, 'user ' || i, 'user' || i || '@bench.local', 'x' FROM n;
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {n_goals - 1})
+            INSERT INTO goals (id, user_id, title, week_start, category)
+            SELECT i + 1, i / {weeks * gpw} + 1, 'goal ' || (i % {gpw} + 1),
+                   date('{START_WEEK}', '+' || ((i / {gpw}) % {weeks} * 7) || ' days'),
+                   CASE (i + {seed}) % {len(CATEGORIES)} {categories} END
+            FROM n;
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {n_tasks - 1})
+            INSERT INTO tasks (id, goal_id, title, due_date, completed, missed)
+            SELECT i + 1, i / {tpg} + 1, 'task ' || (i % {tpg} + 1),
+                   date('{START_WEEK}', '+' || (((i / {tpg} / {gpw}) % {weeks}) * 7 + i % 7) || ' days'),
+                   {_hash_below("i", 1, seed, spec["completion"])},
+                   NOT ({_hash_below("i", 1, seed, spec["completion"])})
+                       AND {_hash_below("i", 2, seed, spec["miss"])}
+            FROM n;
+            COMMIT;
+            PRAGMA synchronous = NORMAL;
+        """)
+    finally:
+        conn.close()
+    loaded = time.perf_counter()
+    db.migrate(path)
+    if not quiet:
+        print(f"built {path}: users={users} goals={n_goals} tasks={n_tasks} "
+              f"(load {loaded - t0:.1f}s, migrate {time.perf_counter() - loaded:.1f}s)")
+    return path
+
+
+def ensure(spec, path=None, quiet=False):
+    """Return a database for `spec`, building it once and reusing it afterwards."""
+    path = path or default_path(spec)
+    if not os.path.exists(path):
+        build(path, spec, quiet=quiet)
+    else:
+        db.migrate(path)
+    return path
+
+
+def add_spec_arguments(parser, tasks=True):
+    if tasks:
+        parser.add_argument("--tasks", type=int, help="target task count; sets --users to reach it")
+    parser.add_argument("--users", type=int, default=DEFAULTS["users"])
+    parser.add_argument("--weeks", type=int, default=DEFAULTS["weeks"])
+    parser.add_argument("--goals-per-week", type=int, default=DEFAULTS["goals_per_week"])
+    parser.add_argument("--tasks-per-goal", type=int, default=DEFAULTS["tasks_per_goal"])
+    parser.add_argument("--completion", type=float, default=DEFAULTS["completion"], help="share of completed tasks")
+    parser.add_argument("--miss", type=float, default=DEFAULTS["miss"], help="share of unfinished tasks marked missed")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+
+
+def spec_from_args(args):
+    spec = {
+        "users": args.users,
+        "weeks": args.weeks,
+        "goals_per_week": args.goals_per_week,
+        "tasks_per_goal": args.tasks_per_goal,
+        "completion": args.completion,
+        "miss": args.miss,
+        "seed": args.seed,
+    }
+    if args.tasks:
+        spec = spec_for_tasks(args.tasks, **{k: v for k, v in spec.items() if k != "users"})
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_spec_arguments(parser)
+    parser.add_argument("--db", default=None, help="output file (default: a spec-named file in the temp dir)")
+    args = parser.parse_args()
+    spec = spec_from_args(args)
+    path = args.db or default_path(spec)
+    if os.path.exists(path):
+        print(f"{path} already exists")
+        return
+    build(path, spec)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,26 @@
 # db.py
 import os
+import time
+import atexit
 import sqlite3
+import json
 import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import date, datetime
 from typing import List
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# ensure a consistent path (db next to this file)
+# ensure a consistent path (db next to this file); GOALS_DB_PATH overrides it (benchmarks, tests)
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "goals.db")
+DB_PATH = os.environ.get("GOALS_DB_PATH") or os.path.join(BASE_DIR, "goals.db")
+
+# connection pool settings (GOALS_DB_POOL_SIZE=0 disables pooling: one connection per call)
+POOL_SIZE = int(os.environ.get("GOALS_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("GOALS_DB_POOL_TIMEOUT", "5.0"))
 
 # expected columns for tables (name -> column sql fragment)
 EXPECTED_GOALS_COLUMNS = {
@@ -45,20 +56,419 @@ EXPECTED_TASKS_COLUMNS = {
 }
 
 
+# ---------- QUERY INSTRUMENTATION ----------
+# Optional JSON-lines file that every finished QueryStats is appended to (offline analysis).
+QUERY_LOG_PATH = os.environ.get("GOALS_DB_QUERY_LOG")
+
+_stats_local = threading.local()
+
+
+class QueryStats:
+    """SQL statements issued while collecting (one Streamlit script run): text, latency and rows returned."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started_at = time.time()
+        self.statements = []
+
+    def record(self, sql, elapsed_ms, rows=0):
+        entry = {"sql": " ".join(str(sql).split())[:500], "ms": elapsed_ms, "rows": rows}
+        self.statements.append(entry)
+        return entry
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(s["ms"] for s in self.statements)
+
+    @property
+    def rows(self):
+        return sum(s["rows"] for s in self.statements)
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "rows": self.rows,
+            "statements": [dict(s, ms=round(s["ms"], 3)) for s in self.statements],
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def start_query_stats(label="") -> QueryStats:
+    """Start recording statements issued by this thread (Streamlit runs each session's script in its own thread)."""
+    stats = QueryStats(label)
+    _stats_local.stats = stats
+    return stats
+
+
+def stop_query_stats():
+    """Stop recording for this thread and return the QueryStats (None if not recording)."""
+    stats = getattr(_stats_local, "stats", None)
+    _stats_local.stats = None
+    if stats is not None and QUERY_LOG_PATH:
+        try:
+            with open(QUERY_LOG_PATH, "a", encoding="utf-8") as fh:
+                fh.write(stats.to_json() + "\n")
+        except OSError as e:
+            logger.warning("Failed to append query stats to %s: %s", QUERY_LOG_PATH, e)
+    return stats
+
+
+def current_query_stats():
+    return getattr(_stats_local, "stats", None)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that records each statement's execute + fetch time and row count into the active QueryStats."""
+
+    _entry = None
+
+    def execute(self, sql, parameters=()):
+        stats = current_query_stats()
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            if stats is not None:
+                self._entry = stats.record(sql, (time.perf_counter() - t0) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        stats = current_query_stats()
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            if stats is not None:
+                self._entry = stats.record(sql, (time.perf_counter() - t0) * 1000)
+
+    def _fetched(self, t0, n):
+        entry = self._entry
+        if entry is not None:
+            entry["ms"] += (time.perf_counter() - t0) * 1000
+            entry["rows"] += n
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows))
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        row = super().__next__()
+        self._fetched(t0, 1)
+        return row
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to the pool it came from.
+    While QueryStats are being collected its cursors are TracedCursors; otherwise plain ones.
+    """
+
+    _pool = None
+
+    def cursor(self, factory=sqlite3.Cursor):
+        if factory is sqlite3.Cursor and current_query_stats() is not None:
+            factory = TracedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        if current_query_stats() is None:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if current_query_stats() is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        pool = self._pool
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+    def close_for_real(self):
+        sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of long-lived sqlite connections.
+
+    `size` caps how many connections may be open at once; acquire() waits up to
+    `timeout` seconds for one to be released. size=0 turns pooling off, so every
+    acquire() opens a fresh connection and close() really closes it.
+    Idle connections are health-checked before being handed out again.
+    read_only=True opens connections with mode=ro and PRAGMA query_only.
+    """
+
+    def __init__(self, path=None, size=None, timeout=None, read_only=False):
+        self.path = path or DB_PATH
+        self.read_only = read_only
+        self.size = max(0, int(POOL_SIZE if size is None else size))
+        self.timeout = POOL_TIMEOUT if timeout is None else timeout
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"opened": 0, "closed": 0, "acquired": 0, "released": 0, "discarded": 0, "waits": 0}
+
+    def _new_connection(self):
+        conn = _open_connection(self.path, factory=PooledConnection, read_only=self.read_only)
+        conn._pool = self
+        self.stats["opened"] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close_for_real()
+        except Exception as e:
+            logger.warning("Failed to close pooled connection: %s", e)
+        self.stats["closed"] += 1
+
+    @staticmethod
+    def _healthy(conn) -> bool:
+        try:
+            sqlite3.Connection.execute(conn, "SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self.size == 0 or self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no sqlite connection available after {self.timeout}s")
+                self.stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        if conn is not None and not self._healthy(conn):
+            logger.warning("Discarding unhealthy pooled connection")
+            self.stats["discarded"] += 1
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+        self.stats["acquired"] += 1
+        return conn
+
+    def release(self, conn):
+        # never hand a half-finished transaction to the next caller
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            keep = True
+        except sqlite3.Error:
+            keep = False
+        with self._cond:
+            self.stats["released"] += 1
+            if keep and not self._closed and self.size > 0:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                self._close(conn)
+            self._cond.notify()
+
+    def close(self):
+        """Close idle connections and refuse new acquires (connections in use close on release)."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+
+_pool = None
+_read_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                init_db()
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_read_pool() -> ConnectionPool:
+    global _read_pool
+    if _read_pool is None:
+        with _pool_lock:
+            if _read_pool is None:
+                init_db()
+                _read_pool = ConnectionPool(read_only=True)
+    return _read_pool
+
+
+def close_pool():
+    """Close the process-wide pools; the next get_connection() starts new ones."""
+    global _pool, _read_pool
+    with _pool_lock:
+        pools = (_pool, _read_pool)
+        _pool = _read_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+
+
+atexit.register(close_pool)
+
+
+def set_pools(pool: ConnectionPool, read_pool: ConnectionPool):
+    """
+    Use pools created elsewhere (e.g. held by Streamlit's st.cache_resource) as the
+    process-wide pools, so a module reload adopts them instead of opening new ones.
+    """
+    global _pool, _read_pool
+    with _pool_lock:
+        _pool, _read_pool = pool, read_pool
+
+
+def data_version(conn: sqlite3.Connection, user_id) -> int:
+    """The user's data version: bumped by triggers on every write to their goals or tasks."""
+    row = conn.execute("SELECT version FROM user_data_version WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
 def get_connection():
-    """Open connection and ensure tables + missing columns exist."""
+    """Borrow a connection from the pool; call close() on it to give it back."""
+    return get_pool().acquire()
+
+
+def get_read_connection():
+    """
+    Borrow a read-only connection (same database file, separate pool).
+    In WAL mode readers work on a snapshot and never block, or wait for, writers.
+    """
+    return get_read_pool().acquire()
+
+
+@contextmanager
+def read_snapshot():
+    """Run several reads against one consistent WAL snapshot; yields a read-only connection."""
+    conn = get_read_connection()
+    try:
+        conn.execute("BEGIN;")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction():
+    """
+    Borrow a connection and run the block as one write transaction:
+    BEGIN IMMEDIATE (take the write lock up front), COMMIT on success, ROLLBACK on error.
+    """
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+
+def _open_connection(path=None, factory=sqlite3.Connection, read_only=False):
+    """Open a configured connection. Schema work happens once, in migrate()."""
     os.makedirs(BASE_DIR, exist_ok=True)  # ensure dir exists
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=5.0)
+    path = path or DB_PATH
+    if read_only:
+        target, uri = Path(path).absolute().as_uri() + "?mode=ro", True
+    else:
+        target, uri = path, False
+    conn = sqlite3.connect(target, check_same_thread=False, timeout=5.0, factory=factory, uri=uri)
     conn.row_factory = sqlite3.Row
 
-    # recommended pragmas
+    # per-connection pragmas (journal_mode=WAL is persistent and set by migrate())
     try:
-        conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA foreign_keys = ON;")
         conn.execute("PRAGMA busy_timeout = 5000;")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON;")
     except Exception as e:
         logger.warning("Failed to set sqlite pragmas: %s", e)
+    return conn
+
 
+def normalize_date(value):
+    """
+    Canonical stored form of a date column: 'YYYY-MM-DD' (sorts and compares as text),
+    or None for empty / unparseable values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    if not text:
+        return None
+    head = text.replace("T", " ").split(" ")[0]
+    try:
+        return datetime.strptime(head, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return None
+
+
+# ---------- MIGRATIONS ----------
+# Numbered, append-only. The database records the last applied number in
+# PRAGMA user_version; migrate() runs whatever is newer, once per process.
+
+def _migration_001_base_schema(conn: sqlite3.Connection):
     # create base tables if they do not exist (these statements will not overwrite existing tables)
     conn.execute("""CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -93,18 +503,403 @@ def get_connection():
         FOREIGN KEY(goal_id) REFERENCES goals(id)
     );""")
 
-    conn.commit()
-
-    # Ensure missing columns are added (safe ALTER TABLE ADD COLUMN)
+    # databases created by older versions may lack newer columns (e.g. goals.category)
     _ensure_table_columns(conn, "users", EXPECTED_USERS_COLUMNS)
     _ensure_table_columns(conn, "goals", EXPECTED_GOALS_COLUMNS)
     _ensure_table_columns(conn, "tasks", EXPECTED_TASKS_COLUMNS)
 
-    # log schema for debugging
-    logger.info("DB initialized at %s", DB_PATH)
-    logger.info(_show_schema(conn))
 
-    return conn
+def _migration_002_hot_path_indexes(conn: sqlite3.Connection):
+    # get_goals_for_week: with a category, equality on all three columns leaves the entries in
+    # rowid (id) order, so ORDER BY id DESC needs no sort; without one, the (user_id, week_start)
+    # prefix finds the week and a temp b-tree sorts its few goals (cheaper than a second index)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_goals_user_week_cat ON goals(user_id, week_start, category);")
+    # get_tasks_for_goal: lookup by goal_id already in ORDER BY missed, completed, due_date order;
+    # also serves detect_missed_tasks_from_week (goal_id=? AND missed=0 AND completed=0)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_goal_order ON tasks(goal_id, missed, completed, due_date);")
+
+
+def _date_check_trigger(table: str, column: str, event: str) -> str:
+    when = "INSERT" if event == "insert" else f"UPDATE OF {column}"
+    return f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_valid_{event}
+        BEFORE {when} ON {table}
+        WHEN NEW.{column} IS NOT NULL AND NEW.{column} IS NOT date(NEW.{column})
+        BEGIN SELECT RAISE(ABORT, '{table}.{column} must be YYYY-MM-DD or NULL'); END;"""
+
+
+def _migration_003_normalize_dates(conn: sqlite3.Connection):
+    # dates are compared as plain text (due_date < ?) so they must all be canonical ISO dates;
+    # empty strings and junk become NULL, 'YYYY-M-D' / datetimes are trimmed to the date
+    conn.create_function("normalize_date", 1, normalize_date, deterministic=True)
+    conn.execute("""UPDATE tasks SET due_date = normalize_date(due_date)
+        WHERE due_date IS NOT normalize_date(due_date);""")
+    conn.execute("""UPDATE goals SET custom_deadline = normalize_date(custom_deadline)
+        WHERE custom_deadline IS NOT normalize_date(custom_deadline);""")
+    # week_start is NOT NULL: only rewrite values that parse
+    conn.execute("""UPDATE goals SET week_start = normalize_date(week_start)
+        WHERE normalize_date(week_start) IS NOT NULL AND week_start IS NOT normalize_date(week_start);""")
+    for table, column in (("tasks", "due_date"), ("goals", "week_start"), ("goals", "custom_deadline")):
+        conn.execute(_date_check_trigger(table, column, "insert"))
+        conn.execute(_date_check_trigger(table, column, "update"))
+
+
+def _bump_version_sql(user_sql: str) -> str:
+    return f"""INSERT INTO user_data_version (user_id, version) {user_sql}
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;"""
+
+
+def _migration_004_data_version(conn: sqlite3.Connection):
+    # one row per user, bumped by triggers inside every write transaction that touches the
+    # user's goals or tasks; cached readers key on it (missing row = version 0)
+    conn.execute("""CREATE TABLE IF NOT EXISTS user_data_version (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );""")
+    goal_user = {
+        "NEW": _bump_version_sql("VALUES (NEW.user_id, 1)"),
+        "OLD": _bump_version_sql("VALUES (OLD.user_id, 1)"),
+    }
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_version_insert AFTER INSERT ON goals
+        BEGIN {goal_user["NEW"]} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_version_update AFTER UPDATE ON goals
+        BEGIN {goal_user["NEW"]} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_version_move AFTER UPDATE OF user_id ON goals
+        WHEN OLD.user_id IS NOT NEW.user_id
+        BEGIN {goal_user["OLD"]} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_version_delete AFTER DELETE ON goals
+        BEGIN {goal_user["OLD"]} END;""")
+    # tasks reach their user through the goal
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_version_insert AFTER INSERT ON tasks
+        BEGIN {_bump_version_sql("SELECT user_id, 1 FROM goals WHERE id = NEW.goal_id")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_version_update AFTER UPDATE ON tasks
+        BEGIN {_bump_version_sql("SELECT user_id, 1 FROM goals WHERE id IN (OLD.goal_id, NEW.goal_id)")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_version_delete AFTER DELETE ON tasks
+        BEGIN {_bump_version_sql("SELECT user_id, 1 FROM goals WHERE id = OLD.goal_id")} END;""")
+
+
+# materialized per-goal task counters: column -> the task row's contribution (0/1)
+GOAL_COUNTERS = {
+    "task_total": "1",
+    "task_active": "(COALESCE({t}.missed, 0) = 0)",
+    "task_completed": "(COALESCE({t}.missed, 0) = 0 AND COALESCE({t}.completed, 0) <> 0)",
+    "task_carried": "(COALESCE({t}.missed, 0) = 0 AND COALESCE({t}.carried_over, 0) <> 0)",
+    "task_missed": "(COALESCE({t}.missed, 0) <> 0)",
+}
+
+SQL_GOAL_COUNTERS_EXPECTED = (
+    "SELECT g.id, " + ", ".join(f"COALESCE(e.{c}, 0) AS {c}" for c in GOAL_COUNTERS)
+    + " FROM goals g LEFT JOIN (SELECT t.goal_id, "
+    + ", ".join(f"SUM({e.format(t='t')}) AS {c}" for c, e in GOAL_COUNTERS.items())
+    + " FROM tasks t GROUP BY t.goal_id) e ON e.goal_id = g.id"
+)
+
+
+def _counter_update_sql(row: str, sign: str) -> str:
+    sets = ", ".join(f"{c} = {c} {sign} {e.format(t=row)}" for c, e in GOAL_COUNTERS.items())
+    return f"UPDATE goals SET {sets} WHERE id = {row}.goal_id;"
+
+
+def _migration_005_goal_counters(conn: sqlite3.Connection):
+    existing = set(_table_columns(conn, "goals"))
+    for column in GOAL_COUNTERS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE goals ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0;")
+    repair_goal_counters(conn)
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_insert AFTER INSERT ON tasks
+        BEGIN {_counter_update_sql("NEW", "+")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_delete AFTER DELETE ON tasks
+        BEGIN {_counter_update_sql("OLD", "-")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_update
+        AFTER UPDATE OF goal_id, completed, missed, carried_over ON tasks
+        BEGIN {_counter_update_sql("OLD", "-")} {_counter_update_sql("NEW", "+")} END;""")
+    # counter updates come with a task write that already bumped the version;
+    # only user-visible goal columns should bump it again
+    conn.execute("DROP TRIGGER IF EXISTS trg_goals_version_update;")
+    conn.execute(f"""CREATE TRIGGER trg_goals_version_update
+        AFTER UPDATE OF user_id, title, description, week_start, custom_deadline, category ON goals
+        BEGIN {_bump_version_sql("VALUES (NEW.user_id, 1)")} END;""")
+
+
+def check_goal_counters(conn: sqlite3.Connection) -> List[tuple]:
+    """Return (goal_id, column, stored, expected) for every counter that disagrees with the tasks."""
+    stored = {r[0]: r[1:] for r in conn.execute(f"SELECT id, {', '.join(GOAL_COUNTERS)} FROM goals")}
+    mismatches = []
+    for row in conn.execute(SQL_GOAL_COUNTERS_EXPECTED):
+        for column, have, want in zip(GOAL_COUNTERS, stored.get(row[0], ()), row[1:]):
+            if have != want:
+                mismatches.append((row[0], column, have, want))
+    return mismatches
+
+
+def repair_goal_counters(conn: sqlite3.Connection) -> int:
+    """Recompute every goal's counters from its tasks; returns the number of goals changed."""
+    sets = ", ".join(f"{c} = e.{c}" for c in GOAL_COUNTERS)
+    stored = ", ".join(f"goals.{c}" for c in GOAL_COUNTERS)
+    expected = ", ".join(f"e.{c}" for c in GOAL_COUNTERS)
+    cur = conn.execute(f"""
+        UPDATE goals SET {sets}
+        FROM ({SQL_GOAL_COUNTERS_EXPECTED}) AS e
+        WHERE e.id = goals.id AND ({stored}) IS NOT ({expected})
+    """)
+    return cur.rowcount
+
+
+# per-goal counter -> weekly_rollups column it is summed into
+ROLLUP_COUNTERS = {
+    "task_active": "tasks",
+    "task_completed": "completed",
+    "task_carried": "carried",
+    "task_missed": "missed",
+}
+
+
+def _rollup_add_sql(row: str) -> str:
+    cols = ", ".join(ROLLUP_COUNTERS.values())
+    values = ", ".join(f"{row}.{c}" for c in ROLLUP_COUNTERS)
+    sets = ", ".join(f"{c} = {c} + excluded.{c}" for c in ("goals", *ROLLUP_COUNTERS.values()))
+    return f"""INSERT INTO weekly_rollups (user_id, week_start, category, goals, {cols})
+            SELECT {row}.user_id, {row}.week_start, COALESCE({row}.category, ''), 1, {values}
+            WHERE {row}.user_id IS NOT NULL
+            ON CONFLICT(user_id, week_start, category) DO UPDATE SET {sets};"""
+
+
+def _rollup_subtract_sql(row: str) -> str:
+    sets = ", ".join(f"{r} = {r} - {row}.{c}" for c, r in ROLLUP_COUNTERS.items())
+    key = f"user_id = {row}.user_id AND week_start = {row}.week_start AND category = COALESCE({row}.category, '')"
+    return f"""UPDATE weekly_rollups SET goals = goals - 1, {sets} WHERE {key};
+            DELETE FROM weekly_rollups WHERE {key} AND goals <= 0;"""
+
+
+def _migration_006_weekly_rollups(conn: sqlite3.Connection):
+    # one row per (user, week, category) summing the goals' task counters, so history
+    # and trend reads are a primary-key range scan; NULL categories are stored as ''
+    conn.execute("""CREATE TABLE IF NOT EXISTS weekly_rollups (
+        user_id INTEGER NOT NULL,
+        week_start TEXT NOT NULL,
+        category TEXT NOT NULL,
+        goals INTEGER NOT NULL DEFAULT 0,
+        tasks INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        carried INTEGER NOT NULL DEFAULT 0,
+        missed INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, week_start, category)
+    ) WITHOUT ROWID;""")
+    rebuild_weekly_rollups(conn)
+    # task writes reach the rollups through the goal counter triggers
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_rollup_insert AFTER INSERT ON goals
+        BEGIN {_rollup_add_sql("NEW")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_rollup_delete AFTER DELETE ON goals
+        BEGIN {_rollup_subtract_sql("OLD")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_goals_rollup_update
+        AFTER UPDATE OF user_id, week_start, category, {", ".join(ROLLUP_COUNTERS)} ON goals
+        BEGIN {_rollup_subtract_sql("OLD")} {_rollup_add_sql("NEW")} END;""")
+
+
+def rebuild_weekly_rollups(conn: sqlite3.Connection, user_id=None) -> int:
+    """Recompute weekly_rollups from the goals (all users, or one); returns the rows written."""
+    where, params = ("user_id = ?", (user_id,)) if user_id is not None else ("user_id IS NOT NULL", ())
+    conn.execute(f"DELETE FROM weekly_rollups WHERE {where};", params)
+    cur = conn.execute(f"""
+        INSERT INTO weekly_rollups (user_id, week_start, category, goals, {", ".join(ROLLUP_COUNTERS.values())})
+        SELECT user_id, week_start, COALESCE(category, ''), COUNT(*), {", ".join(f"SUM({c})" for c in ROLLUP_COUNTERS)}
+        FROM goals WHERE {where}
+        GROUP BY user_id, week_start, COALESCE(category, '');
+    """, params)
+    return cur.rowcount
+
+
+def _open_due_add_sql(row: str) -> str:
+    return f"""INSERT INTO open_due_counts (user_id, due_date, open_tasks)
+            SELECT g.user_id, {row}.due_date, 1 FROM goals g
+            WHERE g.id = {row}.goal_id AND g.user_id IS NOT NULL
+              AND {row}.completed = 0 AND {row}.due_date IS NOT NULL
+            ON CONFLICT(user_id, due_date) DO UPDATE SET open_tasks = open_tasks + 1;"""
+
+
+def _open_due_subtract_sql(row: str) -> str:
+    key = f"user_id = (SELECT user_id FROM goals WHERE id = {row}.goal_id) AND due_date = {row}.due_date"
+    return f"""UPDATE open_due_counts SET open_tasks = open_tasks - 1 WHERE {row}.completed = 0 AND {key};
+            DELETE FROM open_due_counts WHERE {key} AND open_tasks <= 0;"""
+
+
+SQL_OPEN_DUE_EXPECTED = """
+    SELECT g.user_id, t.due_date, COUNT(*) AS open_tasks
+    FROM tasks t JOIN goals g ON g.id = t.goal_id
+    WHERE t.completed = 0 AND t.due_date IS NOT NULL AND g.user_id IS NOT NULL
+    GROUP BY g.user_id, t.due_date
+"""
+
+
+def _migration_007_open_due_counts(conn: sqlite3.Connection):
+    # incomplete tasks per (user, due date): the overdue count before any date is a
+    # primary-key range sum over due dates instead of a walk over the user's tasks
+    conn.execute("""CREATE TABLE IF NOT EXISTS open_due_counts (
+        user_id INTEGER NOT NULL,
+        due_date TEXT NOT NULL,
+        open_tasks INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, due_date)
+    ) WITHOUT ROWID;""")
+    rebuild_open_due_counts(conn)
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_open_due_insert AFTER INSERT ON tasks
+        BEGIN {_open_due_add_sql("NEW")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_open_due_delete AFTER DELETE ON tasks
+        BEGIN {_open_due_subtract_sql("OLD")} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_open_due_update
+        AFTER UPDATE OF goal_id, completed, due_date ON tasks
+        WHEN (OLD.completed = 0 AND OLD.due_date IS NOT NULL) OR (NEW.completed = 0 AND NEW.due_date IS NOT NULL)
+        BEGIN {_open_due_subtract_sql("OLD")} {_open_due_add_sql("NEW")} END;""")
+    # a goal handed to another user takes its open tasks along
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_goals_open_due_move
+        AFTER UPDATE OF user_id ON goals WHEN OLD.user_id IS NOT NEW.user_id
+        BEGIN
+            UPDATE open_due_counts SET open_tasks = open_tasks - (
+                SELECT COUNT(*) FROM tasks t
+                WHERE t.goal_id = NEW.id AND t.completed = 0 AND t.due_date = open_due_counts.due_date)
+            WHERE user_id = OLD.user_id;
+            DELETE FROM open_due_counts WHERE user_id = OLD.user_id AND open_tasks <= 0;
+            INSERT INTO open_due_counts (user_id, due_date, open_tasks)
+            SELECT NEW.user_id, t.due_date, COUNT(*) FROM tasks t
+            WHERE t.goal_id = NEW.id AND t.completed = 0 AND t.due_date IS NOT NULL AND NEW.user_id IS NOT NULL
+            GROUP BY t.due_date
+            ON CONFLICT(user_id, due_date) DO UPDATE SET open_tasks = open_tasks + excluded.open_tasks;
+        END;""")
+    # paginated overdue detail: per goal, incomplete tasks in due_date order
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_tasks_open_due ON tasks(goal_id, due_date)
+        WHERE completed = 0;""")
+
+
+def rebuild_open_due_counts(conn: sqlite3.Connection) -> int:
+    """Recompute open_due_counts from the tasks; returns the rows written."""
+    conn.execute("DELETE FROM open_due_counts;")
+    return conn.execute(f"INSERT INTO open_due_counts (user_id, due_date, open_tasks) {SQL_OPEN_DUE_EXPECTED}").rowcount
+
+
+def check_open_due_counts(conn: sqlite3.Connection) -> List[tuple]:
+    """Return (user_id, due_date, stored, expected) for every open_due_counts row that disagrees with the tasks."""
+    stored = {(r[0], r[1]): r[2] for r in conn.execute("SELECT user_id, due_date, open_tasks FROM open_due_counts")}
+    expected = {(r[0], r[1]): r[2] for r in conn.execute(SQL_OPEN_DUE_EXPECTED)}
+    return [(*key, stored.get(key, 0), expected.get(key, 0))
+            for key in sorted(stored.keys() | expected.keys()) if stored.get(key, 0) != expected.get(key, 0)]
+
+
+def _migration_008_carry_candidates(conn: sqlite3.Connection):
+    # carry-over candidates precomputed by the rollover job: unfinished, uncarried tasks of
+    # the week before `to_week`; carry_scans marks each (user, to_week) already scanned
+    conn.execute("""CREATE TABLE IF NOT EXISTS carry_candidates (
+        user_id INTEGER NOT NULL,
+        to_week TEXT NOT NULL,
+        task_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, to_week, task_id)
+    ) WITHOUT ROWID;""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS carry_scans (
+        user_id INTEGER NOT NULL,
+        to_week TEXT NOT NULL,
+        scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, to_week)
+    ) WITHOUT ROWID;""")
+    # readers re-check every stored candidate, so only writes that can add one (a task
+    # becoming unfinished and uncarried, or a goal moving week) invalidate the scan
+    forget_task_week = """DELETE FROM carry_scans
+            WHERE user_id = (SELECT user_id FROM goals WHERE id = NEW.goal_id)
+              AND to_week = (SELECT date(week_start, '+7 days') FROM goals WHERE id = NEW.goal_id);"""
+    eligible = "NEW.completed = 0 AND NEW.missed = 0 AND NEW.carried_over = 0 AND NEW.due_date IS NOT NULL"
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_carry_scan_insert AFTER INSERT ON tasks
+        WHEN {eligible}
+        BEGIN {forget_task_week} END;""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_tasks_carry_scan_update
+        AFTER UPDATE OF goal_id, completed, missed, carried_over, due_date ON tasks
+        WHEN {eligible}
+        BEGIN {forget_task_week} END;""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_goals_carry_scan_move
+        AFTER UPDATE OF user_id, week_start ON goals
+        BEGIN DELETE FROM carry_scans
+            WHERE user_id = NEW.user_id AND to_week = date(NEW.week_start, '+7 days'); END;""")
+
+
+def _migration_009_sessions(conn: sqlite3.Connection):
+    # server-side login sessions; only a sha256 of the token is stored, so a leaked
+    # database does not hand out live sessions
+    conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+        token_hash TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    ) WITHOUT ROWID;""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);")
+
+
+MIGRATIONS = [
+    (1, "base schema", _migration_001_base_schema),
+    (2, "hot path indexes", _migration_002_hot_path_indexes),
+    (3, "normalize dates", _migration_003_normalize_dates),
+    (4, "per-user data version", _migration_004_data_version),
+    (5, "goal task counters", _migration_005_goal_counters),
+    (6, "weekly rollups", _migration_006_weekly_rollups),
+    (7, "open task due-date counts", _migration_007_open_due_counts),
+    (8, "carry-over candidates", _migration_008_carry_candidates),
+    (9, "login sessions", _migration_009_sessions),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(path=None) -> int:
+    """
+    Bring the database up to SCHEMA_VERSION and return the number of migrations applied.
+    Each migration runs in its own write transaction together with the user_version bump,
+    so a crash never leaves a half-applied step and concurrent starters apply it only once.
+    """
+    path = path or DB_PATH
+    conn = _open_connection(path)
+    applied = 0
+    try:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return 0
+        try:
+            conn.execute("PRAGMA journal_mode=WAL;")
+        except Exception as e:
+            logger.warning("Failed to enable WAL: %s", e)
+        for number, name, step in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                # re-check under the write lock: another process may have got here first
+                if schema_version(conn) >= number:
+                    conn.rollback()
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {int(number)};")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.exception("Migration %03d (%s) failed", number, name)
+                raise
+            applied += 1
+            logger.info("Applied migration %03d: %s", number, name)
+        if applied:
+            logger.info("DB at %s migrated to version %s", path, SCHEMA_VERSION)
+            logger.info(_show_schema(conn))
+        return applied
+    finally:
+        conn.close()
+
+
+_migrated_paths = set()
+_migrate_lock = threading.Lock()
+
+
+def init_db(path=None):
+    """Run migrate() for `path` once per process; later calls are a set lookup."""
+    path = path or DB_PATH
+    if path in _migrated_paths:
+        return
+    with _migrate_lock:
+        if path not in _migrated_paths:
+            migrate(path)
+            _migrated_paths.add(path)
 
 
 def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
@@ -132,7 +927,6 @@ def _ensure_table_columns(conn: sqlite3.Connection, table: str, expected_columns
         except Exception as e:
             # log full error but continue; it's important we don't silently swallow failures
             logger.exception("Failed to add column '%s' to '%s': %s", col, table, e)
-    conn.commit()
 
 
 def _show_schema(conn: sqlite3.Connection) -> str:
@@ -142,8 +936,75 @@ def _show_schema(conn: sqlite3.Connection) -> str:
     return "\n".join(lines)
 
 
-if __name__ == "__main__":
-    # quick local test: run this file and inspect logs
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python db.py", description="Smart Goal Coach database tools.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("migrate", help="apply pending schema migrations")
+    sub.add_parser("schema", help="print the current schema (default)")
+    sub.add_parser("explain", help="EXPLAIN QUERY PLAN for the hot queries; fails on table scans")
+    check = sub.add_parser("check-counters", help="compare goal task counters and open-task counts with the tasks; fails on drift")
+    check.add_argument("--repair", action="store_true", help="recompute drifted counters")
+    rebuild = sub.add_parser("rebuild-rollups", help="recompute the weekly_rollups table from the goals")
+    rebuild.add_argument("--user", type=int, help="only this user id")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        t0 = time.perf_counter()
+        applied = migrate()
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{DB_PATH}: applied {applied} migration(s), schema version {SCHEMA_VERSION} ({elapsed:.1f} ms)")
+        return 0
+
+    if args.command == "explain":
+        import utils
+
+        failures = 0
+        for name, plan, scans in utils.explain_hot_queries():
+            status = "FAIL" if scans else "ok"
+            failures += bool(scans)
+            print(f"[{status}] {name}")
+            for line in plan:
+                print(f"    {line}")
+        return 1 if failures else 0
+
+    if args.command == "check-counters":
+        init_db()
+        with transaction() as c:
+            mismatches = check_goal_counters(c)
+            for goal_id, column, have, want in mismatches:
+                print(f"goal {goal_id}: {column} = {have}, expected {want}")
+            open_due = check_open_due_counts(c)
+            for user_id, due_date, have, want in open_due:
+                print(f"user {user_id} due {due_date}: open_tasks = {have}, expected {want}")
+            repaired = repair_goal_counters(c) if args.repair and mismatches else 0
+            if args.repair and open_due:
+                rebuild_open_due_counts(c)
+        goals = len({m[0] for m in mismatches})
+        if args.repair:
+            print(f"{DB_PATH}: repaired {repaired} goal(s), {len(open_due)} open-task count(s)")
+            return 0
+        print(f"{DB_PATH}: {goals} goal(s) with drifted counters, {len(open_due)} drifted open-task count(s)")
+        return 1 if mismatches or open_due else 0
+
+    if args.command == "rebuild-rollups":
+        init_db()
+        t0 = time.perf_counter()
+        with transaction() as c:
+            rows = rebuild_weekly_rollups(c, args.user)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{DB_PATH}: rebuilt {rows} weekly rollup row(s) ({elapsed:.1f} ms)")
+        return 0
+
+    init_db()
     c = get_connection()
-    print("Schema:\n", _show_schema(c))
-    c.close()
+    try:
+        print(f"Schema (version {schema_version(c)}):\n", _show_schema(c))
+    finally:
+        c.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+# perf.py
+"""
+Lightweight timing spans for one script run.
+
+    with perf.span("dashboard.load"):
+        ...
+
+    @perf.traced
+    def load_week(...):
+        ...
+
+Spans are collected only between start() and stop() on the same thread (Streamlit runs
+each session's script in its own thread, like db.start_query_stats). Outside a recording,
+span() hands back a shared no-op object and a traced function costs one thread-local lookup.
+"""
+import os
+import json
+import time
+import threading
+import functools
+
+_local = threading.local()
+
+
+class SpanRecorder:
+    """Spans of one run, in start order: [name, start_ns, end_ns, depth, parent, args]."""
+
+    def __init__(self, label=""):
+        self.label = label
+        self.started_at = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.thread_id = threading.get_ident()
+        self.spans = []
+        self._open = []  # indexes of the spans currently open, innermost last
+
+    def _begin(self, name, args):
+        index = len(self.spans)
+        parent = self._open[-1] if self._open else None
+        self.spans.append([name, time.perf_counter_ns(), None, len(self._open), parent, args])
+        self._open.append(index)
+        return index
+
+    def _end(self, index):
+        if self.spans[index][2] is not None:
+            return
+        now = time.perf_counter_ns()
+        # closing an outer span also closes anything left open inside it (e.g. st.rerun() mid-loop)
+        while self._open:
+            inner = self._open.pop()
+            self.spans[inner][2] = now
+            if inner == index:
+                break
+
+    def _close_all(self):
+        if self._open:
+            self._end(self._open[0])
+        self.end_ns = time.perf_counter_ns()
+
+    @property
+    def total_ms(self):
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def rows(self):
+        """Flame-style table rows: one per span, indented by depth, with total and self time."""
+        child_ns = [0] * len(self.spans)
+        for name, start, end, depth, parent, args in self.spans:
+            if parent is not None:
+                child_ns[parent] += end - start
+        total_ns = max(1, (self.end_ns or time.perf_counter_ns()) - self.start_ns)
+        out = []
+        for i, (name, start, end, depth, parent, args) in enumerate(self.spans):
+            out.append({
+                "span": "· " * depth + name,
+                "start_ms": round((start - self.start_ns) / 1e6, 3),
+                "ms": round((end - start) / 1e6, 3),
+                "self_ms": round((end - start - child_ns[i]) / 1e6, 3),
+                "pct": round(100 * (end - start) / total_ns, 1),
+                "args": args or {},
+            })
+        return out
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 3),
+            "count": len(self.spans),
+            "spans": self.rows(),
+        }
+
+    def to_chrome_trace(self):
+        """Chrome trace-event JSON (load in chrome://tracing or ui.perfetto.dev)."""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": self.thread_id,
+                   "args": {"name": self.label or "script run"}}]
+        for name, start, end, depth, parent, args in self.spans:
+            events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - self.start_ns) / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": pid,
+                "tid": self.thread_id,
+                "args": {k: str(v) for k, v in (args or {}).items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_chrome_trace_json(self, **kwargs):
+        return json.dumps(self.to_chrome_trace(), **kwargs)
+
+
+class Span:
+    """An open span; ends on end() or when its with-block exits."""
+    __slots__ = ("_recorder", "_index")
+
+    def __init__(self, recorder, index):
+        self._recorder = recorder
+        self._index = index
+
+    def end(self):
+        self._recorder._end(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.end()
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start(label="") -> SpanRecorder:
+    """Start recording spans on this thread."""
+    recorder = SpanRecorder(label)
+    _local.recorder = recorder
+    return recorder
+
+
+def stop():
+    """Stop recording for this thread, close any open spans and return the recorder (None if not recording)."""
+    recorder = getattr(_local, "recorder", None)
+    _local.recorder = None
+    if recorder is not None:
+        recorder._close_all()
+    return recorder
+
+
+def current():
+    return getattr(_local, "recorder", None)
+
+
+def span(name, **args):
+    """
+    Start a span named `name` (dotted, e.g. "dashboard.cards"); use it as a context
+    manager or call .end(). Keyword args are kept as span metadata.
+    """
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        return _NO_SPAN
+    return Span(recorder, recorder._begin(name, args))
+
+
+def traced(fn=None, *, name=None):
+    """Decorator: record each call of `fn` as a span named "<module>.<function>" (or `name`)."""
+    if fn is None:
+        return functools.partial(traced, name=name)
+    label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        recorder = getattr(_local, "recorder", None)
+        if recorder is None:
+            return fn(*args, **kwargs)
+        index = recorder._begin(label, None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            recorder._end(index)
+    return wrapper
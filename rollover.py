@@ -0,0 +1,120 @@
+# rollover.py
+"""
+Week rollover job: store every user's carry-over candidates (unfinished, uncarried tasks
+of the previous week) so the dashboard's carry-over prompt reads a precomputed list.
+
+Users are scanned in batches, one transaction each; a scanned (user, week) is recorded in
+carry_scans, so an interrupted run resumes where it stopped.
+
+    python rollover.py                      # current week, all users
+    python rollover.py --week 2024-01-08 --batch-size 500
+"""
+import os
+import time
+import logging
+import threading
+from datetime import date, timedelta
+
+import db
+import utils
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get("GOALS_ROLLOVER_BATCH", "200"))
+# seconds between background runs; 0 disables the in-app worker
+INTERVAL = float(os.environ.get("GOALS_ROLLOVER_INTERVAL", "900"))
+KEEP_WEEKS = 8
+
+SQL_PENDING_USERS = """
+    SELECT u.id FROM users u
+    WHERE u.id > ? AND NOT EXISTS (
+        SELECT 1 FROM carry_scans s WHERE s.user_id = u.id AND s.to_week = ?)
+    ORDER BY u.id
+    LIMIT ?
+"""
+
+
+def current_week() -> str:
+    return utils.iso(utils.monday_of_week(date.today()))
+
+
+def pending_users(to_week, after_id=0, limit=BATCH_SIZE):
+    """Next `limit` user ids above `after_id` not yet scanned for `to_week`."""
+    conn = db.get_read_connection()
+    try:
+        return [r[0] for r in conn.execute(SQL_PENDING_USERS, (after_id, to_week, limit))]
+    finally:
+        conn.close()
+
+
+def prune(to_week):
+    """Drop candidates and scan marks older than KEEP_WEEKS before `to_week`."""
+    cutoff = utils.iso(date.fromisoformat(to_week) - timedelta(weeks=KEEP_WEEKS))
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM carry_candidates WHERE to_week < ?", (cutoff,))
+        conn.execute("DELETE FROM carry_scans WHERE to_week < ?", (cutoff,))
+
+
+def run_rollover(to_week=None, batch_size=None):
+    """Scan every pending user for `to_week` (default: this week); returns (users, candidates)."""
+    to_week = db.normalize_date(to_week) if to_week else current_week()
+    batch_size = batch_size or BATCH_SIZE
+    users = candidates = 0
+    last_id = 0
+    while True:
+        batch = pending_users(to_week, last_id, batch_size)
+        if not batch:
+            break
+        candidates += utils.scan_carry_candidates(batch, to_week)
+        users += len(batch)
+        last_id = batch[-1]
+    prune(to_week)
+    if users:
+        logger.info("Rollover %s: scanned %d user(s), %d candidate(s)", to_week, users, candidates)
+    return users, candidates
+
+
+class RolloverWorker(threading.Thread):
+    """Daemon thread running run_rollover() every `interval` seconds until stop()."""
+
+    def __init__(self, interval=None):
+        super().__init__(name="rollover", daemon=True)
+        self.interval = interval or INTERVAL
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                run_rollover()
+            except Exception:
+                logger.exception("Rollover run failed")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_worker(interval=None) -> RolloverWorker:
+    worker = RolloverWorker(interval)
+    worker.start()
+    return worker
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python rollover.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--week", help="week (Monday, YYYY-MM-DD) to prepare; default: this week")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    users, candidates = run_rollover(args.week, args.batch_size)
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"{db.DB_PATH}: scanned {users} user(s), stored {candidates} candidate(s) ({elapsed:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
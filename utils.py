@@ -1,26 +1,102 @@
 # utils.py
-import sqlite3
-import bcrypt
-import pandas as pd
+from __future__ import annotations
+
+import os
+import hashlib
+import secrets
+import threading
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
-from db import get_connection
-DB_PATH = "goals.db" 
-import streamlit as st
+from db import (get_connection, get_read_connection, read_snapshot, transaction, normalize_date,
+                data_version as _data_version, EXPECTED_GOALS_COLUMNS, EXPECTED_TASKS_COLUMNS, GOAL_COUNTERS)
+import perf
+
+
+# ---------- LAZY IMPORTS ----------
+# pandas, numpy, bcrypt and streamlit cost ~1 s to import together; load each on first use so
+# `import utils` stays cheap for rollover.py, the CLIs and pages that never touch a DataFrame.
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, so concurrent first uses import once
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+
+pd = _LazyModule("pandas")
+np = _LazyModule("numpy")
+bcrypt = _LazyModule("bcrypt")
+st = _LazyModule("streamlit")
+
+
+def _cache_data(**options):
+    """st.cache_data(**options), applied on the first call instead of at import."""
+    def decorate(fn):
+        cached = None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            nonlocal cached
+            if cached is None:
+                cached = st.cache_data(**options)(fn)
+            return cached(*args, **kwargs)
+        return wrapper
+    return decorate
 
 
 # ---------- AUTH ----------
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+# bcrypt work factor for new hashes; existing hashes with a different cost are rehashed on the
+# next successful login. Hashing runs on a small bounded pool (bcrypt releases the GIL), so a
+# burst of logins uses at most BCRYPT_WORKERS cores instead of one per script thread.
+BCRYPT_ROUNDS = int(os.environ.get("GOALS_BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.environ.get("GOALS_BCRYPT_WORKERS", "2"))
+SESSION_TTL_DAYS = int(os.environ.get("GOALS_SESSION_DAYS", "7"))
+SESSION_GRACE_SECONDS = int(os.environ.get("GOALS_SESSION_GRACE_SECONDS", "60"))
+
+_bcrypt_pool = None
+_bcrypt_pool_lock = threading.Lock()
+
+def _run_bcrypt(fn, *args):
+    global _bcrypt_pool
+    if _bcrypt_pool is None:
+        with _bcrypt_pool_lock:
+            if _bcrypt_pool is None:
+                _bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+    return _bcrypt_pool.submit(fn, *args).result()
+
+def hash_password(password: str, rounds: int = None) -> str:
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return _run_bcrypt(bcrypt.hashpw, password.encode(), salt).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+    return _run_bcrypt(bcrypt.checkpw, password.encode(), hashed.encode())
+
+def hash_rounds(hashed: str) -> int:
+    """Work factor of a bcrypt hash ("$2b$12$..." -> 12), or 0 if it can't be read."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
 
+@perf.traced
 def create_user(name: str, email: str, password: str) -> bool:
+    # hash before taking a pooled connection, so it isn't held for the whole bcrypt round
+    hashed = hash_password(password)
     conn = get_connection()
     try:
         conn.execute(
             "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-            (name, email, hash_password(password))
+            (name, email, hashed)
         )
         conn.commit()
         return True
@@ -30,16 +106,95 @@ def create_user(name: str, email: str, password: str) -> bool:
     finally:
         conn.close()
 
-def login_user(email: str, password: str):
+def _rehash_password(user_id: int, old_hash: str, password: str):
+    """Store `password` at BCRYPT_ROUNDS, unless the hash changed since it was read."""
+    new_hash = hash_password(password)
     conn = get_connection()
+    try:
+        conn.execute("UPDATE users SET password=? WHERE id=? AND password=?", (new_hash, user_id, old_hash))
+        conn.commit()
+    except Exception as e:
+        print("rehash error:", e)
+    finally:
+        conn.close()
+
+@perf.traced
+def login_user(email: str, password: str):
+    conn = get_read_connection()
     try:
         row = conn.execute("SELECT * FROM users WHERE email=?", (email,)).fetchone()
-        if row and verify_password(password, row["password"]):
-            return {"id": row["id"], "name": row["name"], "email": row["email"]}
+    finally:
+        conn.close()
+    if row and verify_password(password, row["password"]):
+        if hash_rounds(row["password"]) != BCRYPT_ROUNDS:
+            _rehash_password(row["id"], row["password"], password)
+        return {"id": row["id"], "name": row["name"], "email": row["email"]}
+    return None
+
+# ---------- SESSIONS ----------
+# A login hands out a random token (kept in a browser cookie); a returning visit trades it for a
+# fresh one instead of re-entering the password, so only the first visit pays for bcrypt. A
+# traded-in token stays valid for SESSION_GRACE_SECONDS more, so two tabs (or reruns) restoring
+# with the same cookie both get in. The table keeps sha256(token), never the token itself.
+SQL_SESSION_USER = """
+    SELECT u.id, u.name, u.email
+    FROM sessions s JOIN users u ON u.id = s.user_id
+    WHERE s.token_hash = ? AND s.expires_at > datetime('now')
+"""
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def create_session(user_id: int, ttl_days: int = None) -> str:
+    """Start a server-side session for `user_id` and return its token."""
+    token = secrets.token_urlsafe(32)
+    days = SESSION_TTL_DAYS if ttl_days is None else ttl_days
+    with transaction() as conn:
+        conn.execute("DELETE FROM sessions WHERE expires_at <= datetime('now')")
+        conn.execute(
+            "INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, datetime('now', ?))",
+            (_token_hash(token), int(user_id), f"+{int(days)} days"))
+    return token
+
+@perf.traced
+def user_for_session(token: str):
+    """Return {id, name, email} for a live session token, or None (no bcrypt involved)."""
+    if not token:
         return None
+    conn = get_read_connection()
+    try:
+        row = conn.execute(SQL_SESSION_USER, (_token_hash(token),)).fetchone()
+        return {"id": row["id"], "name": row["name"], "email": row["email"]} if row else None
     finally:
         conn.close()
 
+@perf.traced
+def rotate_session(token: str):
+    """
+    Exchange a live session token for a new one with a fresh expiry; the old token then
+    expires within SESSION_GRACE_SECONDS. Returns (user, new_token), or (None, None) if
+    the token is unknown or expired.
+    """
+    if not isinstance(token, str) or not token:
+        return None, None
+    new_token = secrets.token_urlsafe(32)
+    with transaction() as conn:
+        row = conn.execute(SQL_SESSION_USER, (_token_hash(token),)).fetchone()
+        if row is None:
+            return None, None
+        conn.execute("UPDATE sessions SET expires_at = MIN(expires_at, datetime('now', ?)) WHERE token_hash = ?",
+                     (f"+{int(SESSION_GRACE_SECONDS)} seconds", _token_hash(token)))
+        conn.execute(
+            "INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, datetime('now', ?))",
+            (_token_hash(new_token), row["id"], f"+{int(SESSION_TTL_DAYS)} days"))
+    return {"id": row["id"], "name": row["name"], "email": row["email"]}, new_token
+
+def end_session(token: str):
+    if not token:
+        return
+    with transaction() as conn:
+        conn.execute("DELETE FROM sessions WHERE token_hash = ?", (_token_hash(token),))
+
 # ---------- WEEK HELPERS ----------
 def monday_of_week(some_date: date) -> date:
     return some_date - timedelta(days=some_date.weekday())
@@ -65,13 +220,21 @@ def _coerce_task_df_types(df: pd.DataFrame) -> pd.DataFrame:
             df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
         else:
             df[col] = 0
-    # Normalize due_date column (keep as string ISO or None)
+    # Missing due dates are NULL in the DB; show them as "" so `if t.due_date:` works on NaN-free rows
     if "due_date" in df.columns:
         df["due_date"] = df["due_date"].fillna("")
     else:
         df["due_date"] = ""
     return df
 
+# stay well below SQLite's bound-parameter limit (999 on older builds)
+_SQLITE_MAX_PARAMS = 900
+
+def _chunks(seq, size=_SQLITE_MAX_PARAMS):
+    seq = list(seq)
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
 def _normalize_category(cat):
     """Return normalized category key: 'personal', 'work', or 'study'."""
     if not cat:
@@ -81,7 +244,146 @@ def _normalize_category(cat):
         return cat
     return "personal"
 
+# ---------- DATA VERSION ----------
+# Cached readers take the owner's data version as an extra argument, so st.cache_data
+# (shared by all sessions) keys on it: one primary-key lookup per call replaces the read,
+# and any committed write - from any session or process - moves readers to a fresh entry.
+CACHE_MAX_ENTRIES = int(os.environ.get("GOALS_CACHE_ENTRIES", "1024"))
+
+SQL_GOAL_DATA_VERSION = """
+    SELECT COALESCE(v.version, 0) FROM goals g
+    LEFT JOIN user_data_version v ON v.user_id = g.user_id
+    WHERE g.id = ?
+"""
+
+@perf.traced
+def data_version(user_id):
+    """The user's data version; changes whenever any of their goals or tasks is written."""
+    conn = get_read_connection()
+    try:
+        return _data_version(conn, user_id)
+    finally:
+        conn.close()
+
+@perf.traced
+def goal_data_version(goal_id):
+    """data_version() of the goal's owner (None for an unknown goal)."""
+    conn = get_read_connection()
+    try:
+        row = conn.execute(SQL_GOAL_DATA_VERSION, (goal_id,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+# ---------- WEEK CACHE ----------
+WEEK_CACHE_MAX_ENTRIES = int(os.environ.get("GOALS_WEEK_CACHE_ENTRIES", "256"))
+WEEK_CACHE_MAX_BYTES = int(float(os.environ.get("GOALS_WEEK_CACHE_MB", "64")) * 1024 * 1024)
+
+def _week_nbytes(week):
+    frames = [week["goals"], *week["tasks"].values()]
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+class WeekCache:
+    """
+    Process-wide LRU of load_week() results keyed by (user_id, week_start, category),
+    bounded by entry count and approximate DataFrame memory.
+
+    Writers call invalidate() with the (user_id, week_start) pairs they touched, after
+    committing. Each pair has a generation number: a load that started before an
+    invalidation is not stored, so a read racing a write cannot cache stale data.
+    Entries also carry the user's data version, which catches writes made by other
+    processes.
+    """
+
+    def __init__(self, max_entries=WEEK_CACHE_MAX_ENTRIES, max_bytes=WEEK_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (week, nbytes)
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def generation(self, user_id, week_start):
+        with self._lock:
+            return self._generations.get((user_id, week_start), 0)
+
+    def get(self, key, version):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[2] != version:
+                del self._entries[key]
+                self._bytes -= item[1]
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, week, generation, version):
+        nbytes = _week_nbytes(week)
+        with self._lock:
+            if self._generations.get(key[:2], 0) != generation or nbytes > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (week, nbytes, version)
+            self._bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, dropped, _) = self._entries.popitem(last=False)
+                self._bytes -= dropped
+                self.evictions += 1
+
+    def invalidate(self, weeks):
+        """Drop every cached category of each (user_id, week_start) pair."""
+        with self._lock:
+            for user_id, week_start in weeks:
+                pair = (user_id, week_start)
+                self._generations[pair] = self._generations.get(pair, 0) + 1
+                self.invalidations += 1
+                for cat in (None, "personal", "work", "study"):
+                    item = self._entries.pop((user_id, week_start, cat), None)
+                    if item is not None:
+                        self._bytes -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self._bytes, "evictions": self.evictions, "invalidations": self.invalidations}
+
+_week_cache = WeekCache()
+
+def week_cache_stats():
+    """Hit/miss/eviction counters and size of the process-wide week cache."""
+    return _week_cache.stats()
+
+def _goal_weeks(conn, goal_ids):
+    """(user_id, week_start) pairs of the given goals."""
+    weeks = set()
+    for chunk in _chunks(set(goal_ids)):
+        q = f"SELECT DISTINCT user_id, week_start FROM goals WHERE id IN ({', '.join('?' * len(chunk))})"
+        weeks.update((r[0], r[1]) for r in conn.execute(q, chunk))
+    return weeks
+
+def _task_weeks(conn, task_ids):
+    """(user_id, week_start) pairs of the goals owning the given tasks."""
+    weeks = set()
+    for chunk in _chunks(set(task_ids)):
+        q = f"""SELECT DISTINCT g.user_id, g.week_start FROM tasks t JOIN goals g ON g.id = t.goal_id
+                WHERE t.id IN ({', '.join('?' * len(chunk))})"""
+        weeks.update((r[0], r[1]) for r in conn.execute(q, chunk))
+    return weeks
+
 # ---------- GOAL CRUD ----------
+@perf.traced
 def create_goal(user_id, title, description, week_start_iso, custom_deadline_iso=None, category='personal'):
     category = _normalize_category(category)
     conn = get_connection()
@@ -89,54 +391,66 @@ def create_goal(user_id, title, description, week_start_iso, custom_deadline_iso
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO goals (user_id, title, description, week_start, custom_deadline, category) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, title, description, week_start_iso, custom_deadline_iso, category)
+            (user_id, title, description, normalize_date(week_start_iso), normalize_date(custom_deadline_iso), category)
         )
         conn.commit()
+        _week_cache.invalidate({(user_id, normalize_date(week_start_iso))})
         return cur.lastrowid
     finally:
         conn.close()
 
 
 
+@perf.traced
 def update_goal(goal_id, title, description, week_start_iso, custom_deadline_iso, category='personal'):
     category = _normalize_category(category)
     conn = get_connection()
     try:
+        touched = _goal_weeks(conn, [goal_id])
         conn.execute("""
             UPDATE goals SET title=?, description=?, week_start=?, custom_deadline=?, category=? WHERE id=?
-        """, (title, description, week_start_iso, custom_deadline_iso, category, goal_id))
+        """, (title, description, normalize_date(week_start_iso), normalize_date(custom_deadline_iso), category, goal_id))
         conn.commit()
+        # the goal may have moved to another week
+        _week_cache.invalidate(touched | {(u, normalize_date(week_start_iso)) for u, _ in touched})
     finally:
         conn.close()
 
+@perf.traced
 def delete_goal(goal_id):
     conn = get_connection()
     try:
+        touched = _goal_weeks(conn, [goal_id])
         conn.execute("DELETE FROM tasks WHERE goal_id=?", (goal_id,))
         conn.execute("DELETE FROM goals WHERE id=?", (goal_id,))
         conn.commit()
+        _week_cache.invalidate(touched)
     finally:
         conn.close()
 
+SQL_GOALS_FOR_WEEK = "SELECT * FROM goals WHERE user_id=? AND week_start=? ORDER BY id DESC"
+SQL_GOALS_FOR_WEEK_CATEGORY = "SELECT * FROM goals WHERE user_id=? AND week_start=? AND category=? ORDER BY id DESC"
+
+@perf.traced
 def get_goals_for_week(user_id, week_start_iso, category=None):
-    conn = get_connection()
+    cat = _normalize_category(category) if category and str(category).lower() != "all" else None
+    return _goals_for_week_at(user_id, week_start_iso, cat, data_version(user_id))
+
+@_cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _goals_for_week_at(user_id, week_start_iso, category, version):
+    # `version` is only part of the cache key: any write to the user's data changes it
+    conn = get_read_connection()
     try:
-        if category and str(category).lower() != "all":
-            cat = _normalize_category(category)
-            df = pd.read_sql(
-                "SELECT * FROM goals WHERE user_id=? AND week_start=? AND category=? ORDER BY id DESC",
-                conn, params=(user_id, week_start_iso, cat)
-            )
+        if category:
+            df = pd.read_sql(SQL_GOALS_FOR_WEEK_CATEGORY, conn, params=(user_id, week_start_iso, category))
         else:
-            df = pd.read_sql(
-                "SELECT * FROM goals WHERE user_id=? AND week_start=? ORDER BY id DESC",
-                conn, params=(user_id, week_start_iso)
-            )
+            df = pd.read_sql(SQL_GOALS_FOR_WEEK, conn, params=(user_id, week_start_iso))
         return df
     finally:
         conn.close()
 
 # ---------- TASK CRUD ----------
+@perf.traced
 def create_task(goal_id, title, notes, due_date_iso, carried_over=0, carried_from_week=None):
     conn = get_connection()
     try:
@@ -144,23 +458,27 @@ def create_task(goal_id, title, notes, due_date_iso, carried_over=0, carried_fro
         cur.execute("""
             INSERT INTO tasks (goal_id, title, notes, due_date, carried_over, carried_from_week)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (goal_id, title, notes, due_date_iso, 1 if carried_over else 0, carried_from_week))
+        """, (goal_id, title, notes, normalize_date(due_date_iso), 1 if carried_over else 0, carried_from_week))
         conn.commit()
+        _week_cache.invalidate(_goal_weeks(conn, [goal_id]))
         return cur.lastrowid
     finally:
         conn.close()
 
+@perf.traced
 def update_task(task_id, title, notes, due_date_iso, completed):
     """
     Update a task; store completed as 0/1 and return True on success.
     """
     conn = get_connection()
     try:
+        touched = _task_weeks(conn, [task_id])
         conn.execute(
             "UPDATE tasks SET title=?, notes=?, due_date=?, completed=? WHERE id=?",
-            (title, notes, due_date_iso, 1 if bool(completed) else 0, task_id)
+            (title, notes, normalize_date(due_date_iso), 1 if bool(completed) else 0, task_id)
         )
         conn.commit()
+        _week_cache.invalidate(touched)
         return True
     except Exception as e:
         print("update_task error:", e)
@@ -168,66 +486,257 @@ def update_task(task_id, title, notes, due_date_iso, completed):
     finally:
         conn.close()
 
+SQL_TOGGLE_GOAL_COUNTERS = f"SELECT user_id, week_start, {', '.join(GOAL_COUNTERS)} FROM goals WHERE id=?"
+
+@perf.traced
+def set_task_completed(task_id, completed):
+    """
+    Tick or untick one task and return its goal's counters as updated by the same
+    transaction: {"goal_id", "task_total", "task_active", ...}; None for an unknown task.
+    """
+    with transaction() as conn:
+        row = conn.execute("UPDATE tasks SET completed=? WHERE id=? RETURNING goal_id",
+                           (1 if completed else 0, task_id)).fetchone()
+        goal = conn.execute(SQL_TOGGLE_GOAL_COUNTERS, (row[0],)).fetchone() if row else None
+    if goal is None:
+        return None
+    _week_cache.invalidate({(goal["user_id"], goal["week_start"])})
+    return {"goal_id": row[0], **{c: goal[c] for c in GOAL_COUNTERS}}
+
+SQL_MISSED_TASKS = """
+    SELECT t.id, t.title, t.due_date, g.title as goal_title
+    FROM tasks t
+    JOIN goals g ON g.id = t.goal_id
+    WHERE g.user_id = ? AND t.completed = 0
+      AND t.due_date < ?
+"""
+
+# overdue = incomplete with a due date before the cutoff (same rows as SQL_MISSED_TASKS)
+SQL_OVERDUE_COUNT = """
+    SELECT COALESCE(SUM(open_tasks), 0) FROM open_due_counts
+    WHERE user_id = ? AND due_date < ?
+"""
+
+SQL_OVERDUE_PAGE = """
+    SELECT t.id, t.title, t.due_date, g.title as goal_title
+    FROM goals g
+    JOIN tasks t ON t.goal_id = g.id
+    WHERE g.user_id = ? AND t.completed = 0
+      AND t.due_date < ?
+    ORDER BY t.due_date, t.id
+    LIMIT ? OFFSET ?
+"""
+
+@perf.traced
+def count_overdue_tasks(user_id, before_iso):
+    """Number of the user's incomplete tasks due before `before_iso`, from the trigger-maintained open_due_counts."""
+    conn = get_read_connection()
+    try:
+        return conn.execute(SQL_OVERDUE_COUNT, (user_id, normalize_date(before_iso))).fetchone()[0]
+    finally:
+        conn.close()
+
+@perf.traced
+def get_overdue_tasks(user_id, before_iso, limit=50, offset=0):
+    """One page of the tasks count_overdue_tasks counts, oldest due date first."""
+    return fetch_df(SQL_OVERDUE_PAGE, (user_id, normalize_date(before_iso), int(limit), int(offset)))
+
+# ---------- BULK TASK WRITES ----------
+_TASK_UPDATE_FIELDS = ("title", "notes", "due_date", "completed")
+
+@perf.traced
+def create_tasks(tasks):
+    """
+    Insert many tasks in one transaction.
+    `tasks` is an iterable of dicts with goal_id, title and optional notes, due_date,
+    carried_over, carried_from_week. Returns the new ids, in input order.
+    """
+    rows = [
+        (t["goal_id"], t["title"], t.get("notes"), normalize_date(t.get("due_date")),
+         1 if t.get("carried_over") else 0, t.get("carried_from_week"))
+        for t in tasks
+    ]
+    if not rows:
+        return []
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO tasks (goal_id, title, notes, due_date, carried_over, carried_from_week)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        # AUTOINCREMENT ids are consecutive while we hold the write lock
+        last = conn.execute("SELECT last_insert_rowid();").fetchone()[0]
+        touched = _goal_weeks(conn, [r[0] for r in rows])
+    _week_cache.invalidate(touched)
+    return list(range(last - len(rows) + 1, last + 1))
+
+def _existing_task_ids(conn, task_ids):
+    found = set()
+    for chunk in _chunks(set(task_ids)):
+        q = f"SELECT id FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})"
+        found.update(r[0] for r in conn.execute(q, chunk))
+    return found
+
+@perf.traced
+def update_tasks(updates):
+    """
+    Update many tasks in one transaction.
+    Each update is a dict with "id" plus any of title, notes, due_date, completed; only the
+    given fields change. Returns one bool per update: False when the task does not exist or
+    the update names no field to change (such entries are skipped).
+    """
+    updates = list(updates)
+    if not updates:
+        return []
+    groups = {}
+    changes = []  # per update: does it name any field?
+    for u in updates:
+        fields = tuple(f for f in _TASK_UPDATE_FIELDS if f in u)
+        changes.append(bool(fields))
+        if not fields:
+            continue
+        values = []
+        for f in fields:
+            v = u[f]
+            if f == "due_date":
+                v = normalize_date(v)
+            elif f == "completed":
+                v = 1 if bool(v) else 0
+            values.append(v)
+        groups.setdefault(fields, []).append((*values, u["id"]))
+
+    if not groups:
+        return [False] * len(updates)
+
+    with transaction() as conn:
+        existing = _existing_task_ids(conn, [u["id"] for u, c in zip(updates, changes) if c])
+        touched = _task_weeks(conn, existing)
+        for fields, rows in groups.items():
+            sets = ", ".join(f"{f}=?" for f in fields)
+            conn.executemany(f"UPDATE tasks SET {sets} WHERE id=?", rows)
+    _week_cache.invalidate(touched)
+    return [c and u["id"] in existing for u, c in zip(updates, changes)]
+
+@perf.traced
 def get_missed_tasks(user_id, week_iso):
     """Return all missed (incomplete and past due) tasks up to current week."""
-    query = """
-        SELECT t.id, t.title, t.due_date, g.title as goal_title
-        FROM tasks t
-        JOIN goals g ON g.id = t.goal_id
-        WHERE g.user_id = ? AND t.completed = 0
-          AND date(t.due_date) < date(?)
-    """
-    return fetch_df(query, (user_id, week_iso))
+    return _missed_tasks_at(user_id, normalize_date(week_iso), data_version(user_id))
+
+@_cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _missed_tasks_at(user_id, week_iso, version):
+    return fetch_df(SQL_MISSED_TASKS, (user_id, week_iso))
 
 
 def fetch_df(query, params=()):
-    """Run a read-only SQL query and return results as a pandas DataFrame."""
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    """Run a read-only SQL query on a pooled read-only connection and return a DataFrame."""
+    conn = get_read_connection()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
 
+@perf.traced
 def delete_task(task_id):
     conn = get_connection()
     try:
+        touched = _task_weeks(conn, [task_id])
         conn.execute("DELETE FROM tasks WHERE id=?", (task_id,))
         conn.commit()
+        _week_cache.invalidate(touched)
     finally:
         conn.close()
 
+SQL_TASKS_FOR_GOAL = "SELECT * FROM tasks WHERE goal_id=? ORDER BY missed ASC, completed ASC, due_date"
+
+@perf.traced
 def get_tasks_for_goal(goal_id):
     """
     Return tasks for a goal ordered so active & incomplete tasks appear first,
     then completed tasks, then missed tasks — all ordered by due_date inside those groups.
     Also coerce types for columns used in calculations.
     """
-    conn = get_connection()
+    return _tasks_for_goal_at(goal_id, goal_data_version(goal_id))
+
+@_cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _tasks_for_goal_at(goal_id, version):
+    conn = get_read_connection()
     try:
         # Order by missed (0 first), completed (0 first), then due_date asc
-        df = pd.read_sql(
-            "SELECT * FROM tasks WHERE goal_id=? ORDER BY missed ASC, completed ASC, due_date",
-            conn, params=(goal_id,)
-        )
+        df = pd.read_sql(SQL_TASKS_FOR_GOAL, conn, params=(goal_id,))
         df = _coerce_task_df_types(df)
         return df
     finally:
         conn.close()
 
-# ---------- PROGRESS & SUMMARY ----------
-def _safe_sum(series):
-    if series is None or len(series) == 0:
-        return 0
-    try:
-        return int(pd.to_numeric(series, errors="coerce").fillna(0).sum())
-    except Exception:
-        s = 0
-        for v in series:
-            try:
-                s += int(v)
-            except Exception:
-                continue
-        return s
+# ---------- WEEK LOADER ----------
+_GOAL_COLS = list(EXPECTED_GOALS_COLUMNS) + list(GOAL_COUNTERS)
+_TASK_COLS = list(EXPECTED_TASKS_COLUMNS)
+
+SQL_LOAD_WEEK = (
+    "SELECT " + ", ".join(f"g.{c} AS g_{c}" for c in _GOAL_COLS) + ", "
+    + ", ".join(f"t.{c}" for c in _TASK_COLS) + """
+    FROM goals g
+    LEFT JOIN tasks t ON t.goal_id = g.id
+    WHERE g.user_id = ? AND g.week_start = ?{category}
+    ORDER BY g.id DESC, t.missed ASC, t.completed ASC, t.due_date, t.id
+"""
+)
+
+@perf.traced
+def load_week(user_id, week_start_iso, category=None):
+    """
+    Load a week's goals and all their tasks with one JOIN.
 
+    Returns {"goals": DataFrame (as get_goals_for_week), "tasks": {goal_id: DataFrame
+    (as get_tasks_for_goal)}, "progress": {goal_id: percent (as counter_progress)}}.
+    Results are served from the week cache until a write touches the week; callers
+    must treat the returned frames as read-only.
+    """
+    week_start_iso = normalize_date(week_start_iso)
+    cat = _normalize_category(category) if category and str(category).lower() != "all" else None
+    key = (user_id, week_start_iso, cat)
+    # read the version before the data: a write in between only makes the entry look stale
+    version = data_version(user_id)
+    week = _week_cache.get(key, version)
+    if week is None:
+        generation = _week_cache.generation(user_id, week_start_iso)
+        week = _load_week(user_id, week_start_iso, cat)
+        _week_cache.put(key, week, generation, version)
+    return week
+
+def _load_week(user_id, week_start_iso, category):
+    if category:
+        sql = SQL_LOAD_WEEK.format(category=" AND g.category = ?")
+        params = (user_id, week_start_iso, category)
+    else:
+        sql = SQL_LOAD_WEEK.format(category="")
+        params = (user_id, week_start_iso)
+    df = fetch_df(sql, params)
+
+    goals = df[[f"g_{c}" for c in _GOAL_COLS]].drop_duplicates(subset="g_id")
+    goals.columns = _GOAL_COLS
+    goals = goals.reset_index(drop=True)
+
+    rows = df.loc[df["id"].notna(), _TASK_COLS].astype({"id": int, "goal_id": int})
+    rows = _coerce_task_df_types(rows)
+    empty = _coerce_task_df_types(None)
+    groups = {gid: grp.reset_index(drop=True) for gid, grp in rows.groupby("goal_id", sort=False)}
+
+    tasks, progress = {}, {}
+    for g in goals[["id", "task_active", "task_completed"]].itertuples(index=False):
+        tasks[g.id] = groups.get(g.id, empty)
+        progress[g.id] = counter_progress(g.task_completed, g.task_active)
+    return {"goals": goals, "tasks": tasks, "progress": progress}
+
+
+@perf.traced
+def week_goals(week, category=None):
+    """Goals of a load_week() result, optionally narrowed to one category (None/'all' = every goal)."""
+    goals = week["goals"]
+    if category and str(category).lower() != "all":
+        goals = goals[goals["category"] == _normalize_category(category)].reset_index(drop=True)
+    return goals
+
+# ---------- PROGRESS & SUMMARY ----------
 # paste into utils.py replacing existing goal_progress
 
 # def _coerce_completed_val(v):
@@ -300,27 +809,76 @@ def _safe_sum(series):
 #     print("=== end debug ===")
 #     return pct
 
-def goal_progress(tasks_df):
+SQL_GOAL_COUNTERS = f"SELECT {', '.join(GOAL_COUNTERS)} FROM goals WHERE id=?"
+
+@perf.traced
+def goal_counters(goal_id):
+    """The goal's trigger-maintained task counters ({} for an unknown goal)."""
+    conn = get_read_connection()
+    try:
+        row = conn.execute(SQL_GOAL_COUNTERS, (goal_id,)).fetchone()
+        return dict(row) if row else {}
+    finally:
+        conn.close()
+
+def counter_progress(completed, active):
     """
-    Compute goal completion percentage safely.
-    Handles boolean, int, or string-completed fields.
+    Progress percent from goal counters: completed over active (not missed) tasks, the
+    same share weekly_summary reports as "completion". Missed tasks have been carried
+    over or given up, so they no longer hold a goal below 100%.
     """
-    if tasks_df is None or tasks_df.empty:
-        return 0
+    return round(completed / active * 100) if active else 0
+
+def counter_complete(completed, active):
+    """True when every active task is completed; exact, unlike counter_progress(...) == 100 (199/200 rounds up)."""
+    return active > 0 and completed == active
+
+_TRUE_STRINGS = ("1", "true", "yes")
 
-    # Normalize the 'completed' column to booleans
-    tasks_df["completed"] = tasks_df["completed"].apply(
-        lambda x: True if str(x).lower() in ["1", "true", "yes"] else False
-    )
+def _flag(tasks_df, column):
+    """A 0/1, bool or "true"/"yes" column as a numpy bool array (all False when missing)."""
+    if column not in tasks_df.columns:
+        return np.zeros(len(tasks_df), dtype=bool)
+    col = tasks_df[column]
+    if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+        return col.to_numpy(dtype=float, na_value=0) != 0
+    return col.astype(str).str.strip().str.lower().isin(_TRUE_STRINGS).to_numpy()
 
-    total = len(tasks_df)
-    done = tasks_df["completed"].sum()
+def _active_done(tasks_df):
+    active = ~_flag(tasks_df, "missed")
+    return active, active & _flag(tasks_df, "completed")
 
-    if total == 0:
+def goal_progress(tasks_df):
+    """
+    Completion percent of one goal's tasks: completed over active (not missed) tasks,
+    as counter_progress and weekly_summary. Handles boolean, int, or string flags and
+    leaves `tasks_df` untouched.
+    """
+    if tasks_df is None or tasks_df.empty:
         return 0
+    active, done = _active_done(tasks_df)
+    return counter_progress(int(np.count_nonzero(done)), int(np.count_nonzero(active)))
 
-    # Round to nearest whole number for cleaner display
-    return round((done / total) * 100)
+def goals_progress(tasks_df):
+    """
+    goal_progress for every goal of a multi-goal task frame in one grouped pass:
+    a Series of int percents indexed by goal_id (sorted). Rows without a goal_id are ignored.
+    """
+    empty = pd.Series(dtype=int, name="progress").rename_axis("goal_id")
+    if tasks_df is None or tasks_df.empty:
+        return empty
+    if tasks_df["goal_id"].isna().any():
+        # a null goal_id upcasts the column to float; drop those rows and key by int ids again
+        tasks_df = tasks_df.dropna(subset=["goal_id"]).astype({"goal_id": int})
+        if tasks_df.empty:
+            return empty
+    active, done = _active_done(tasks_df)
+    codes, goal_ids = pd.factorize(tasks_df["goal_id"], sort=True)
+    n_active = np.bincount(codes, weights=active, minlength=len(goal_ids))
+    n_done = np.bincount(codes, weights=done, minlength=len(goal_ids))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(n_active > 0, np.round(n_done / n_active * 100), 0)
+    return pd.Series(pct.astype(int), index=pd.Index(goal_ids, name="goal_id"), name="progress")
 
 
 def inspect_goal_tasks(goal_id):
@@ -328,7 +886,7 @@ def inspect_goal_tasks(goal_id):
     Debug helper: returns (raw_rows, normalized_df) and prints them.
     Use this to verify what's actually in the DB for a given goal_id.
     """
-    conn = get_connection()
+    conn = get_read_connection()
     try:
         import pprint
         q = "SELECT * FROM tasks WHERE goal_id=? ORDER BY id"
@@ -354,73 +912,228 @@ def inspect_goal_tasks(goal_id):
         conn.close()
 
 
-def weekly_summary(user_id, week_start_iso, category=None):
-    goals = get_goals_for_week(user_id, week_start_iso, category=category)
-    total_goals = len(goals)
-    total_active_tasks = 0
-    completed_active_tasks = 0
-    carried = 0
-    missed = 0
-
-    for g in goals.itertuples():
-        tasks = get_tasks_for_goal(g.id)
-        if tasks is None or tasks.empty:
-            continue
-
-        missed += _safe_sum(tasks["missed"])
-
-        active = tasks[tasks["missed"] == 0]
-        n_active = len(active)
-        total_active_tasks += n_active
-
-        if n_active:
-            completed_active_tasks += _safe_sum(active["completed"])
-            carried += _safe_sum(active["carried_over"])
-
-    completion = int(round((completed_active_tasks / total_active_tasks * 100))) if total_active_tasks else 0
+# read from weekly_rollups (per user/week/category sums of the goal counters, kept by
+# triggers); summing over categories gives the all-categories row of a week
+SQL_WEEKLY_SUMMARIES = """
+    SELECT r.week_start,
+           SUM(r.goals) AS goals,
+           SUM(r.tasks) AS tasks,
+           SUM(r.completed) AS completed_tasks,
+           SUM(r.carried) AS carried,
+           SUM(r.missed) AS missed
+    FROM weekly_rollups r
+    WHERE r.user_id = ? AND r.week_start IN ({weeks}){category}
+    GROUP BY r.week_start
+"""
+
+# raw rollup rows of a date range; history views aggregate them in pandas
+SQL_ROLLUP_RANGE = """
+    SELECT r.week_start, r.category, r.goals, r.tasks, r.completed, r.carried, r.missed
+    FROM weekly_rollups r
+    WHERE r.user_id = ? AND r.week_start BETWEEN ? AND ?
+    ORDER BY r.week_start
+"""
+
+def _summary_dict(goals=0, tasks=0, completed_tasks=0, carried=0, missed=0):
+    """Weekly summary dict; completion is the share of active (not missed) tasks completed."""
+    completion = int(round((completed_tasks / tasks * 100))) if tasks else 0
     completion = max(0, min(100, completion))
-
     return {
-        "goals": total_goals,
-        "tasks": total_active_tasks,
-        "completed_tasks": completed_active_tasks,
+        "goals": goals,
+        "tasks": tasks,
+        "completed_tasks": completed_tasks,
         "completion": completion,
         "carried": carried,
         "missed": missed
     }
 
+@perf.traced
+def weekly_summaries(user_id, weeks, category=None):
+    """
+    Summaries for many weeks in one aggregate pass: {week_iso: summary}, in the order given.
+    Weeks without goals get an all-zero summary.
+    """
+    weeks = tuple(iso(w) for w in weeks)
+    if not weeks:
+        return {}
+    cat = _normalize_category(category) if category and str(category).lower() != "all" else None
+    return _weekly_summaries_at(user_id, weeks, cat, data_version(user_id))
+
+@_cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _weekly_summaries_at(user_id, weeks, category, version):
+    out = {w: _summary_dict() for w in weeks}
+    cat_sql, cat_params = "", ()
+    if category:
+        cat_sql, cat_params = " AND r.category = ?", (category,)
+
+    with read_snapshot() as conn:
+        for chunk in _chunks(dict.fromkeys(weeks)):
+            sql = SQL_WEEKLY_SUMMARIES.format(weeks=", ".join("?" * len(chunk)), category=cat_sql)
+            for r in conn.execute(sql, (user_id, *chunk, *cat_params)):
+                out[r["week_start"]] = _summary_dict(r["goals"], r["tasks"], r["completed_tasks"],
+                                                     r["carried"], r["missed"])
+    return out
+
+@perf.traced
+def weekly_summary(user_id, week_start_iso, category=None):
+    week_start_iso = iso(week_start_iso)
+    return weekly_summaries(user_id, [week_start_iso], category=category)[week_start_iso]
+
+_ROLLUP_COUNTS = ["goals", "tasks", "completed", "carried", "missed"]
+
+def _week_range(start_week, end_week):
+    return tuple(iso(monday_of_week(date.fromisoformat(normalize_date(w)))) for w in (start_week, end_week))
+
+def _with_completion(df):
+    pct = (df["completed"] / df["tasks"].where(df["tasks"] > 0) * 100).round().fillna(0)
+    df["completion"] = pct.clip(0, 100).astype(int)
+    return df
+
+@perf.traced
+def load_history(user_id, start_week, end_week):
+    """
+    All weekly_rollups rows of the user from start_week to end_week (inclusive), one per
+    (week_start, category) that has goals, from a single primary-key range read.
+    Feed it to history_by_week / history_by_category.
+    """
+    start, end = _week_range(start_week, end_week)
+    return _history_at(user_id, start, end, data_version(user_id))
+
+@_cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _history_at(user_id, start, end, version):
+    df = fetch_df(SQL_ROLLUP_RANGE, (user_id, start, end))
+    df.attrs["range"] = (start, end)
+    return df
+
+def history_by_week(history, category=None):
+    """
+    Per-week totals of a load_history() frame, one row per Monday of its range (weeks
+    without goals are zero-filled), with completion % as weekly_summary rounds it.
+    """
+    start, end = history.attrs["range"]
+    if category and str(category).lower() != "all":
+        history = history[history["category"] == _normalize_category(category)]
+    weeks = pd.date_range(start, end, freq="7D").strftime("%Y-%m-%d")
+    df = (history.groupby("week_start")[_ROLLUP_COUNTS].sum()
+          .reindex(weeks, fill_value=0).rename_axis("week_start").reset_index())
+    return _with_completion(df.astype({c: int for c in _ROLLUP_COUNTS}))
+
+def history_by_category(history):
+    """Totals per category over the whole load_history() range (missing categories count as personal)."""
+    df = history.assign(category=history["category"].replace("", "personal"))
+    df = df.groupby("category")[_ROLLUP_COUNTS].sum().reset_index()
+    return _with_completion(df.astype({c: int for c in _ROLLUP_COUNTS}))
+
+@perf.traced
+def weekly_history(user_id, start_week, end_week, category=None):
+    """
+    Weekly summaries from start_week to end_week (inclusive) as one DataFrame, one row per
+    Monday with weekly_summary's columns; weeks without goals are zero-filled.
+    """
+    df = history_by_week(load_history(user_id, start_week, end_week), category)
+    return df.rename(columns={"completed": "completed_tasks"})[
+        ["week_start", "goals", "tasks", "completed_tasks", "carried", "missed", "completion"]]
+
 
 # ---------- CARRY-OVER LOGIC ----------
+SQL_DETECT_MISSED_TASKS = """
+    SELECT t.*, g.title as goal_title, g.week_start
+    FROM tasks t
+    JOIN goals g ON t.goal_id = g.id
+    WHERE g.user_id = ? AND g.week_start = ? AND t.completed = 0 AND t.due_date < ?
+    AND t.carried_over = 0 AND t.missed = 0
+    ORDER BY t.due_date
+"""
+
+@perf.traced
 def detect_missed_tasks_from_week(user_id, from_week_iso, before_date_iso):
-    conn = get_connection()
+    conn = get_read_connection()
     try:
-        q = """
-        SELECT t.*, g.title as goal_title, g.week_start
-        FROM tasks t
-        JOIN goals g ON t.goal_id = g.id
-        WHERE g.user_id = ? AND g.week_start = ? AND t.completed = 0 AND date(t.due_date) < date(?)
-        AND t.carried_over = 0 AND t.missed = 0
-        ORDER BY t.due_date
-        """
-        df = pd.read_sql(q, conn, params=(user_id, from_week_iso, before_date_iso))
+        df = pd.read_sql(SQL_DETECT_MISSED_TASKS, conn, params=(user_id, from_week_iso, normalize_date(before_date_iso)))
         df = _coerce_task_df_types(df)
         return df
     finally:
         conn.close()
 
-def mark_tasks_missed(task_ids):
-    if not task_ids:
-        return 0
-    conn = get_connection()
+# ---------- PRECOMPUTED CARRY CANDIDATES ----------
+# filled per (user, to_week) by scan_carry_candidates (batched by rollover.py, or on demand);
+# the same conditions as SQL_DETECT_MISSED_TASKS with from_week = to_week - 7 days
+SQL_SCAN_CARRY_CANDIDATES = """
+    INSERT OR IGNORE INTO carry_candidates (user_id, to_week, task_id)
+    SELECT g.user_id, ?, t.id
+    FROM goals g
+    JOIN tasks t ON t.goal_id = g.id
+    WHERE g.user_id IN ({users}) AND g.week_start = ? AND t.completed = 0 AND t.due_date < ?
+      AND t.carried_over = 0 AND t.missed = 0
+"""
+
+# stored candidates are re-checked so tasks finished, carried or moved since the scan drop out
+SQL_CARRY_CANDIDATES = """
+    SELECT t.*, g.title as goal_title, g.week_start
+    FROM carry_candidates c
+    JOIN tasks t ON t.id = c.task_id
+    JOIN goals g ON g.id = t.goal_id
+    WHERE c.user_id = ? AND c.to_week = ?
+      AND g.user_id = c.user_id AND g.week_start = ? AND t.completed = 0 AND t.due_date < c.to_week
+      AND t.carried_over = 0 AND t.missed = 0
+    ORDER BY t.due_date, t.id
+"""
+
+def scan_carry_candidates(user_ids, to_week_iso):
+    """
+    Recompute the carry-over candidates of `user_ids` for `to_week_iso` in one transaction
+    and mark them scanned. Returns the number of candidates stored.
+    """
+    to_week = normalize_date(to_week_iso)
+    from_week = iso(date.fromisoformat(to_week) - timedelta(days=7))
+    user_ids = list(dict.fromkeys(user_ids))
+    stored = 0
+    with transaction() as conn:
+        for chunk in _chunks(user_ids):
+            users = ", ".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM carry_candidates WHERE to_week = ? AND user_id IN ({users})", (to_week, *chunk))
+            stored += conn.execute(SQL_SCAN_CARRY_CANDIDATES.format(users=users),
+                                   (to_week, *chunk, from_week, to_week)).rowcount
+        conn.executemany("INSERT OR REPLACE INTO carry_scans (user_id, to_week) VALUES (?, ?)",
+                         [(u, to_week) for u in user_ids])
+    return stored
+
+@perf.traced
+def get_carry_candidates(user_id, to_week_iso):
+    """
+    Unfinished, uncarried tasks from the week before `to_week_iso` (as detect_missed_tasks_from_week),
+    read from the precomputed list; the user is scanned first if the rollover job has not yet.
+    """
+    to_week = normalize_date(to_week_iso)
+    from_week = iso(date.fromisoformat(to_week) - timedelta(days=7))
+    conn = get_read_connection()
     try:
-        cur = conn.cursor()
-        for tid in task_ids:
-            cur.execute("UPDATE tasks SET missed=1 WHERE id=?", (tid,))
-        conn.commit()
-        return len(task_ids)
+        scanned = conn.execute("SELECT 1 FROM carry_scans WHERE user_id=? AND to_week=?", (user_id, to_week)).fetchone()
     finally:
         conn.close()
+    if not scanned:
+        scan_carry_candidates([user_id], to_week)
+    return _coerce_task_df_types(fetch_df(SQL_CARRY_CANDIDATES, (user_id, to_week, from_week)))
 
+@perf.traced
+def mark_tasks_missed(task_ids):
+    """
+    Set missed=1 on many tasks in one transaction (chunked WHERE id IN (...)).
+    Returns one bool per id: False when the task does not exist.
+    """
+    task_ids = list(task_ids or [])
+    if not task_ids:
+        return []
+    marked = set()
+    with transaction() as conn:
+        touched = _task_weeks(conn, task_ids)
+        for chunk in _chunks(set(task_ids)):
+            q = f"UPDATE tasks SET missed=1 WHERE id IN ({', '.join('?' * len(chunk))}) RETURNING id"
+            marked.update(r[0] for r in conn.execute(q, chunk).fetchall())
+    _week_cache.invalidate(touched)
+    return [tid in marked for tid in task_ids]
+
+@perf.traced
 def mark_goal_completed(goal_id, completed=True):
     """
     Mark active tasks under a goal completed/uncompleted.
@@ -433,70 +1146,143 @@ def mark_goal_completed(goal_id, completed=True):
         cur.execute("UPDATE tasks SET completed=? WHERE goal_id=? AND (missed IS NULL OR missed=0)",
                     (1 if completed else 0, goal_id))
         conn.commit()
+        _week_cache.invalidate(_goal_weeks(conn, [goal_id]))
         return cur.rowcount if hasattr(cur, "rowcount") else None
     finally:
         conn.close()
 
+SQL_CARRY_GOAL_LOOKUP = "SELECT id, category FROM goals WHERE user_id=? AND week_start=? AND title=?"
+
+def _carried_due_date(orig_due, to_week_iso):
+    """Same weekday in the target week; falls back to the target Monday when there is no usable due date."""
+    try:
+        orig_dt = datetime.strptime(orig_due, "%Y-%m-%d").date()
+        to_monday = datetime.strptime(to_week_iso, "%Y-%m-%d").date()
+        return (to_monday + timedelta(days=orig_dt.weekday())).strftime("%Y-%m-%d")
+    except Exception:
+        return to_week_iso
+
+@perf.traced
 def carry_over_selected_tasks(task_ids, from_week_iso, to_week_iso, user_id):
+    """
+    Clone the selected tasks into `to_week_iso` and mark the originals missed, in one transaction.
+
+    Clones go to the week's "Carried Over" goal (created if needed) or, for tasks whose goal
+    has a different category, to a "Carried Over - <Category>" goal per category.
+    Returns the number of tasks carried.
+    """
     if not task_ids:
         return 0
-    conn = get_connection()
+    task_ids = list(task_ids)
+    touched = {(user_id, to_week_iso)}
     try:
-        cur = conn.cursor()
-        # try find existing 'Carried Over' goal for to_week_iso
-        r = cur.execute("SELECT id, category FROM goals WHERE user_id=? AND week_start=? AND title='Carried Over'", (user_id, to_week_iso)).fetchone()
-        if r:
-            carried_goal_id, carried_cat = r[0], r[1] or "personal"
-        else:
-            cur.execute("INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
-                        (user_id, "Carried Over", f"Tasks carried from {from_week_iso}", to_week_iso, "personal"))
-            carried_goal_id = cur.lastrowid
-            carried_cat = "personal"
-
-        carried_count = 0
-        for tid in task_ids:
-            row = cur.execute("SELECT * FROM tasks WHERE id=?", (tid,)).fetchone()
-            if not row:
-                continue
-            # original goal category
-            orig_goal = cur.execute("SELECT category FROM goals WHERE id=?", (row["goal_id"],)).fetchone()
-            orig_cat = orig_goal["category"] if orig_goal and orig_goal["category"] else "personal"
-
-            orig_due = row["due_date"]
-            try:
-                orig_dt = datetime.strptime(orig_due, "%Y-%m-%d").date()
-                weekday = orig_dt.weekday()
-                to_monday = datetime.strptime(to_week_iso, "%Y-%m-%d").date()
-                new_due = to_monday + timedelta(days=weekday)
-                new_due_iso = new_due.strftime("%Y-%m-%d")
-            except Exception:
-                new_due_iso = to_week_iso
-
-            target_goal_id = carried_goal_id
-            # If categories differ, create/find a carried goal specific to this category
-            if orig_cat != carried_cat:
-                title_candidate = f"Carried Over - {orig_cat.title()}"
-                r2 = cur.execute("SELECT id FROM goals WHERE user_id=? AND week_start=? AND title=?", (user_id, to_week_iso, title_candidate)).fetchone()
-                if r2:
-                    target_goal_id = r2[0]
-                else:
-                    cur.execute("INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
-                                (user_id, title_candidate, f"Tasks carried from {from_week_iso}", to_week_iso, orig_cat))
-                    target_goal_id = cur.lastrowid
-
-            cur.execute("""
+        with transaction() as conn:
+            # try find existing 'Carried Over' goal for to_week_iso
+            r = conn.execute(SQL_CARRY_GOAL_LOOKUP, (user_id, to_week_iso, "Carried Over")).fetchone()
+            if r:
+                carried_goal_id, carried_cat = r[0], r[1] or "personal"
+            else:
+                carried_goal_id = conn.execute(
+                    "INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, "Carried Over", f"Tasks carried from {from_week_iso}", to_week_iso, "personal")
+                ).lastrowid
+                carried_cat = "personal"
+
+            # all selected tasks with their goal's category, in one JOIN
+            found = {}
+            for chunk in _chunks(set(task_ids)):
+                q = f"""
+                    SELECT t.id, t.title, t.notes, t.due_date, g.category, g.user_id, g.week_start
+                    FROM tasks t LEFT JOIN goals g ON g.id = t.goal_id
+                    WHERE t.id IN ({', '.join('?' * len(chunk))})
+                """
+                for row in conn.execute(q, chunk):
+                    found[row["id"]] = row
+            selected = [found[tid] for tid in task_ids if tid in found]
+            touched.update((r["user_id"], r["week_start"]) for r in found.values())
+            if not selected:
+                return 0
+
+            # resolve (or create) one carry goal per other category
+            titles = {}
+            for row in selected:
+                cat = row["category"] or "personal"
+                if cat != carried_cat:
+                    titles.setdefault(f"Carried Over - {cat.title()}", cat)
+            target_by_title = {}
+            if titles:
+                q = f"""
+                    SELECT id, title FROM goals
+                    WHERE user_id=? AND week_start=? AND title IN ({', '.join('?' * len(titles))})
+                    ORDER BY id
+                """
+                for gid, title in conn.execute(q, (user_id, to_week_iso, *titles)):
+                    target_by_title.setdefault(title, gid)
+                for title, cat in titles.items():
+                    if title not in target_by_title:
+                        target_by_title[title] = conn.execute(
+                            "INSERT INTO goals (user_id, title, description, week_start, category) VALUES (?, ?, ?, ?, ?)",
+                            (user_id, title, f"Tasks carried from {from_week_iso}", to_week_iso, cat)
+                        ).lastrowid
+
+            clones = []
+            for row in selected:
+                cat = row["category"] or "personal"
+                target_goal_id = carried_goal_id if cat == carried_cat else target_by_title[f"Carried Over - {cat.title()}"]
+                clones.append((target_goal_id, row["title"], row["notes"],
+                               _carried_due_date(row["due_date"], to_week_iso), from_week_iso))
+            conn.executemany("""
                 INSERT INTO tasks (goal_id, title, notes, due_date, carried_over, carried_from_week)
                 VALUES (?, ?, ?, ?, 1, ?)
-            """, (target_goal_id, row["title"], row["notes"], new_due_iso, from_week_iso))
-            cur.execute("UPDATE tasks SET missed=1 WHERE id=?", (tid,))
-            carried_count += 1
-
-        conn.commit()
-        return carried_count
+            """, clones)
+            for chunk in _chunks(set(found)):
+                conn.execute(f"UPDATE tasks SET missed=1 WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            return len(clones)
+    finally:
+        # after commit (or rollback), so no reader can re-cache the pre-write week
+        _week_cache.invalidate(touched)
+
+
+# ---------- QUERY PLANS ----------
+# (name, sql, sample params) for every query on a per-render path; `python db.py explain`
+# fails if any of them has to SCAN goals or tasks instead of searching an index.
+HOT_QUERIES = [
+    ("get_goals_for_week", SQL_GOALS_FOR_WEEK, (1, "2024-01-01")),
+    ("get_goals_for_week[category]", SQL_GOALS_FOR_WEEK_CATEGORY, (1, "2024-01-01", "work")),
+    ("get_tasks_for_goal", SQL_TASKS_FOR_GOAL, (1,)),
+    ("get_missed_tasks", SQL_MISSED_TASKS, (1, "2024-01-01")),
+    ("count_overdue_tasks", SQL_OVERDUE_COUNT, (1, "2024-01-01")),
+    ("get_overdue_tasks", SQL_OVERDUE_PAGE, (1, "2024-01-01", 50, 0)),
+    ("detect_missed_tasks_from_week", SQL_DETECT_MISSED_TASKS, (1, "2024-01-01", "2024-01-08")),
+    ("get_carry_candidates", SQL_CARRY_CANDIDATES, (1, "2024-01-08", "2024-01-01")),
+    ("scan_carry_candidates", SQL_SCAN_CARRY_CANDIDATES.format(users="?, ?"),
+     ("2024-01-08", 1, 2, "2024-01-01", "2024-01-08")),
+    ("weekly_summary", SQL_WEEKLY_SUMMARIES.format(weeks="?", category=""), (1, "2024-01-01")),
+    ("weekly_summaries[category]", SQL_WEEKLY_SUMMARIES.format(weeks="?, ?", category=" AND r.category = ?"),
+     (1, "2024-01-01", "2024-01-08", "work")),
+    ("load_history", SQL_ROLLUP_RANGE, (1, "2023-01-02", "2024-01-01")),
+    ("carry_over_selected_tasks[goal lookup]", SQL_CARRY_GOAL_LOOKUP, (1, "2024-01-08", "Carried Over")),
+    ("goal_data_version", SQL_GOAL_DATA_VERSION, (1,)),
+    ("goal_counters", SQL_GOAL_COUNTERS, (1,)),
+    ("user_for_session", SQL_SESSION_USER, ("0" * 64,)),
+]
+
+def explain_hot_queries():
+    """Return [(name, plan_lines, scan_lines)] for HOT_QUERIES; scan_lines lists full scans of goals/tasks."""
+    conn = get_read_connection()
+    try:
+        results = []
+        for name, sql, params in HOT_QUERIES:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            plan = [r["detail"] for r in rows]
+            scans = [d for d in plan if d.startswith("SCAN") and d.split()[1] in ("goals", "tasks", "g", "t")]
+            results.append((name, plan, scans))
+        return results
     finally:
         conn.close()
 
 
+@perf.traced
 def render_smart_insight_engine(user_id: str, week_start: str, summary: dict):
     """
     Reusable Smart Insight Engine UI block.
@@ -507,17 +1293,15 @@ def render_smart_insight_engine(user_id: str, week_start: str, summary: dict):
     st.markdown("---")
     st.subheader("🧠 Smart Insight Engine")
 
-    # Fetch missed tasks
+    # Overdue count comes from the maintained per-due-date counts, no task rows are fetched
     from datetime import datetime
     import utils  # safe circular import if inside same module
 
-    missed_tasks = utils.get_missed_tasks(user_id, week_start)
-
     completion_rate = summary.get("completion", 0)
     total_goals = summary.get("goals", 0)
     total_tasks = summary.get("tasks", 0)
     carried = summary.get("carried", 0)
-    overdue_count = len(missed_tasks) if missed_tasks is not None else 0
+    overdue_count = utils.count_overdue_tasks(user_id, week_start)
 
     insights = []
 